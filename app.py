@@ -1,5 +1,4 @@
 import streamlit as st
-import streamlit_autorefresh
 from app.pages.sidebar import render_sidebar
 from app.utils.session import set_logged_in, is_logged_in
 from app.pages.login import render_page as login_page
@@ -8,8 +7,11 @@ from app.pages.guest_pass_registration import render_page as guest_pass_registra
 from app.pages.vehicle_history import render_page as history_page
 from app.pages.guest_form import render_guest_page
 from app.pages.sidebar import LOGGED_IN_MENU
-from app.database import fetch_pending_guests
 from app.pages.analytics import render_page as analytics_page
+from app.pages.performance import render_page as performance_page
+from app.utils.metrics import start_prometheus_file_exporter
+from app.utils.refresh import note_activity
+from app import settings
 
 def initialize_session_state():
     """Initialize session state variables if they don't exist."""
@@ -17,8 +19,6 @@ def initialize_session_state():
         st.session_state.logged_in = False
     if "action_done" not in st.session_state:
         st.session_state.action_done = False
-    if "guest_actions" not in st.session_state:
-        st.session_state.guest_actions = {}
 
 def get_page_route():
     """Get the current page route from query parameters."""
@@ -34,6 +34,13 @@ def handle_logout():
 def main():
     # Initialize session state
     initialize_session_state()
+
+    # Runs the user triggered keep the session's views from idling
+    note_activity()
+
+    # Keep the Prometheus metrics file up to date when one is configured
+    if settings.METRICS_FILE:
+        start_prometheus_file_exporter(settings.METRICS_FILE)
     
     # Get route and check if it's guest page
     route = get_page_route()
@@ -57,14 +64,7 @@ def main():
             initial_sidebar_state="expanded"
         )
     
-    # Fetch pending guests
-    try:
-        latest_pending_guests = fetch_pending_guests()
-    except Exception as e:
-        st.error(f"Error fetching pending guests: {e}")
-        latest_pending_guests = None
-    
-    # Render sidebar with latest pending guests
+    # Render sidebar; it reads the pending guests itself
     selected = render_sidebar()
     
     # Handle page routing
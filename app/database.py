@@ -1,344 +1,658 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import (
+    and_, case, create_engine, delete, extract, func, insert, or_, select
+)
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
-import urllib.parse
+from sqlalchemy.pool import StaticPool
+import threading
+from datetime import date, datetime, time, timedelta
 import pandas as pd
 import streamlit as st
 from sqlalchemy.exc import SQLAlchemyError
+from app import settings
+from app.schema import (
+    calendar_date, guest, guest_temp, metadata, registered_vehicle, users, vehicle_history
+)
+from app.utils.query_cache import cached_query, invalidate_queries, skip_caching
+from app.utils.plate_registry import PLATE_SEPARATORS, get_plate_registry, normalize_plate
+from app.utils.guest_verification import get_guest_verifier
+from app.utils.pending_guests import get_pending_guest_feed
+from app.utils.plate_search import PLATE_SEARCH_MAX_PLATES, get_plate_search_index
+from app.utils.pool_metrics import InstrumentedQueuePool, pool_metrics
+from app.utils.metrics import attach_engine_metrics, track_query
 
-server = "34.60.160.28"  
-database = "scvacs"       
-username = "sqlserver"    
-password = urllib.parse.quote_plus("scvacs@1234")  # Escape special characters in password
-port = "1433"  # Default MS SQL Server port
+_engine = None
+_engine_lock = threading.Lock()
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
+Base = declarative_base(metadata=metadata)
 
-# SQLAlchemy connection string using pytds
-DATABASE_URL = (
-    f"mssql+pytds://{username}:{password}@{server}:{port}/{database}"
-)
+def engine_options(url):
+    """create_engine keyword arguments for the configured pool and timeouts."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    options = {"echo": settings.SQL_ECHO, "pool_pre_ping": settings.POOL_PRE_PING}
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        # An in-memory database lives in a single connection
+        options["poolclass"] = StaticPool
+        options["connect_args"] = {"check_same_thread": False}
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.POOL_SIZE,
+        max_overflow=settings.MAX_OVERFLOW,
+        pool_timeout=settings.POOL_TIMEOUT,
+        pool_recycle=settings.POOL_RECYCLE,
+    )
+    if backend == "mssql" and url.get_driver_name() == "pytds":
+        options["connect_args"] = {"login_timeout": settings.CONNECT_TIMEOUT, "timeout": settings.QUERY_TIMEOUT}
+    elif backend == "sqlite":
+        options["connect_args"] = {"timeout": settings.CONNECT_TIMEOUT, "check_same_thread": False}
+    return options
+
+def get_engine():
+    """The shared engine, created on first use so importing this module never touches the database."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if settings.DATABASE_URL is None:
+                    raise RuntimeError(
+                        "No database configured: set SCVACS_DATABASE_URL, or SCVACS_DB_HOST, SCVACS_DB_USER "
+                        "and SCVACS_DB_PASSWORD, in the environment or .env"
+                    )
+                engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+                pool_metrics.attach(engine)
+                attach_engine_metrics(engine)
+                _engine = engine
+    return _engine
+
+def SessionLocal():
+    """New ORM session bound to the shared engine."""
+    return _session_factory(bind=get_engine())
+
+def __getattr__(name):
+    # Keeps `from app.database import engine` working for older callers
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def with_connection(func, *args):
+    """Call func(conn, *args) on a connection of its own, e.g. from a worker thread."""
+    with get_engine().connect() as conn:
+        return func(conn, *args)
+
+def set_sql_echo(enabled):
+    """Turn SQL statement logging on or off at runtime."""
+    get_engine().echo = enabled
+
+def get_pool_metrics():
+    """Connection pool counters and live pool state, for sizing the pool."""
+    return pool_metrics.snapshot(get_engine())
 
-# SQLAlchemy setup
-engine = create_engine(DATABASE_URL, echo=True)  # Echo=True for detailed logs
-# engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+# Seconds a cached read stays fresh; writes below invalidate the guest entries immediately
+HISTORY_PAGE_TTL = 2
+REGISTRATIONS_TTL = 10
+ANALYTICS_TTL = 30
+
+# Read functions whose cached results depend on the guest tables
+GUEST_QUERIES = ("fetch_recent_registrations", "get_guest_passes_issued", "get_todays_guests")
+
+# Shorthand for the vehicle_history columns used by most queries below
+vh = vehicle_history.c
+
+# Compared with = rather than IS: SQL Server rejects "is_approved IS 1"
+GUEST_APPROVED = guest.c.is_approved == True  # noqa: E712
+
+def after_keyset(timestamp, vehicle_history_id, descending=True):
+    """Condition for rows after a (timestamp, vehicle_history_id) keyset position in the given order."""
+    if descending:
+        return or_(vh.timestamp < timestamp, and_(vh.timestamp == timestamp, vh.vehicle_history_id < vehicle_history_id))
+    return or_(vh.timestamp > timestamp, and_(vh.timestamp == timestamp, vh.vehicle_history_id > vehicle_history_id))
 
 # Queries from vehicle_history.py
 
+@track_query()
 def fetch_vehicle_history():
     try:
-        with engine.connect() as conn:
-            query = """
-                SELECT plate_number, confidence, timestamp, registration_status
-                FROM vehicle_history
-                ORDER BY timestamp DESC
-            """
-            result = conn.execute(text(query))
+        with get_engine().connect() as conn:
+            query = (
+                select(vh.plate_number, vh.confidence, vh.timestamp, vh.registration_status)
+                .order_by(vh.timestamp.desc())
+            )
+            result = conn.execute(query)
             data = pd.DataFrame(result.fetchall(), columns=["Plate Number", "Confidence", "Timestamp", "Registration Status"])
             data['Registration Status'] = data['Registration Status'].astype(int).replace({1: 'Registered', 0: 'Unregistered'})
             return data
     except Exception as e:
         return f"Error fetching vehicle history: {e}"
 
+def normalized_plate_column():
+    """plate_number normalized in SQL the way normalize_plate() does it: uppercase, separators removed."""
+    column = func.upper(vh.plate_number)
+    for separator in PLATE_SEPARATORS:
+        column = func.replace(column, separator, "")
+    return column
+
+def plate_filter_condition(plate_filter):
+    """
+    Plate search as an index seek: the plate search index finds the matching plates and
+    only their rows are read. Falls back to a substring scan when the index can't answer,
+    matching the same normalized plates, so both paths find the same rows.
+    """
+    try:
+        plates = get_plate_search_index().search(plate_filter)
+    except Exception:
+        plates = None
+    if plates is None or len(plates) > PLATE_SEARCH_MAX_PLATES:
+        normalized = normalize_plate(plate_filter)
+        if not normalized:
+            # Nothing to normalize to, e.g. only punctuation; autoescape matches % and _ literally
+            return vh.plate_number.contains(plate_filter, autoescape=True)
+        return normalized_plate_column().contains(normalized, autoescape=True)
+    return vh.plate_number.in_(plates)
+
+def history_filters(plate_filter=None, start_date=None, end_date=None):
+    """WHERE conditions for the plate and date filters of the history views."""
+    conditions = []
+    if plate_filter:
+        conditions.append(plate_filter_condition(plate_filter))
+    if start_date:
+        conditions.append(vh.timestamp >= datetime.combine(start_date, time.min))
+    if end_date:
+        # Half-open range so the whole end day is included
+        conditions.append(vh.timestamp < datetime.combine(end_date + timedelta(days=1), time.min))
+    return conditions
+
+@cached_query(ttl=HISTORY_PAGE_TTL)
+@track_query()
+def fetch_vehicle_history_page(plate_filter=None, start_date=None, end_date=None, cursor=None, page_size=50):
+    """
+    Fetch one page of vehicle history, newest first.
+    Filters are applied in SQL and pages are walked with a (timestamp, vehicle_history_id)
+    keyset cursor, so only the visible window is read from the table.
+    Returns (data, next_cursor); next_cursor is None on the last page.
+    """
+    conditions = history_filters(plate_filter, start_date, end_date)
+    if cursor:
+        conditions.append(after_keyset(*cursor))
+    query = (
+        select(vh.vehicle_history_id, vh.plate_number, vh.confidence, vh.timestamp, vh.registration_status)
+        .where(*conditions)
+        .order_by(vh.timestamp.desc(), vh.vehicle_history_id.desc())
+        .limit(page_size + 1)
+    )
+    try:
+        with get_engine().connect() as conn:
+            rows = conn.execute(query).fetchall()
+    except Exception as e:
+        skip_caching()
+        return f"Error fetching vehicle history: {e}", None
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1].timestamp, rows[-1].vehicle_history_id)
+
+    data = pd.DataFrame(
+        [(row.plate_number, row.confidence, row.timestamp, row.registration_status) for row in rows],
+        columns=["Plate Number", "Confidence", "Timestamp", "Registration Status"],
+    )
+    data['Registration Status'] = data['Registration Status'].astype(int).replace({1: 'Registered', 0: 'Unregistered'})
+    return data, next_cursor
+
+@track_query()
+def fetch_vehicle_history_since(after_id=None, limit=5000, oldest_first=False, start=None, until=None, through_id=None):
+    """
+    Fetch up to `limit` vehicle_history rows with a vehicle_history_id after `after_id`
+    (and up to `through_id`), optionally only those with timestamps in [start, until).
+    Incremental readers follow the id rather than the timestamp: ids grow in the order rows
+    are written, while timestamps are the gates' event times and a late detection can carry
+    one older than rows already read.
+    Rows are newest (highest id) first, so with no `after_id` the newest `limit` rows are
+    returned; `oldest_first` walks forward from `after_id` instead.
+    """
+    conditions = []
+    if after_id is not None:
+        conditions.append(vh.vehicle_history_id > after_id)
+    if through_id is not None:
+        conditions.append(vh.vehicle_history_id <= through_id)
+    if start:
+        conditions.append(vh.timestamp >= start)
+    if until:
+        conditions.append(vh.timestamp < until)
+
+    order = vh.vehicle_history_id if oldest_first else vh.vehicle_history_id.desc()
+    query = (
+        select(vh.vehicle_history_id, vh.plate_number, vh.confidence, vh.timestamp, vh.registration_status)
+        .where(*conditions)
+        .order_by(order)
+        .limit(limit)
+    )
+    with get_engine().connect() as conn:
+        rows = conn.execute(query).fetchall()
+    return pd.DataFrame(
+        [tuple(row) for row in rows],
+        columns=["ID", "Plate Number", "Confidence", "Timestamp", "Registration Status"],
+    )
+
+def stream_vehicle_history(plate_filter=None, start_date=None, end_date=None, chunk_size=10000):
+    """
+    Yield filtered vehicle_history rows oldest first, in lists of up to `chunk_size` rows.
+    Rows are streamed from a server-side cursor, so memory use doesn't grow with the range.
+    """
+    query = (
+        select(vh.plate_number, vh.confidence, vh.timestamp, vh.registration_status)
+        .where(*history_filters(plate_filter, start_date, end_date))
+        .order_by(vh.timestamp, vh.vehicle_history_id)
+    )
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(query)
+        for partition in result.partitions(chunk_size):
+            yield partition
+
 # Queries from guess_pass_registration.py
 
+@track_query()
 def insert_guest(guest_data):
     try:
-        query = """
-        INSERT INTO guest (
-            name, plate_number, id_number, phone_number, email,
-            address, visit_purpose, check_in_date, check_out_date, is_approved
-        ) VALUES (
-            :name, :plate_number, :id_number, :phone_number, :email, 
-            :address, :visit_purpose, :check_in_date, :check_out_date, :is_approved
-        )
-        """
-        with engine.connect() as conn:
-            conn.execute(text(query), guest_data)
+        with get_engine().connect() as conn:
+            conn.execute(insert(guest), guest_data)
             conn.commit()
+        invalidate_queries(*GUEST_QUERIES)
+        get_plate_registry().invalidate()
         return True
     except Exception as e:
         st.error(f"Error inserting guest data: {e}")
         return False
     
+@cached_query(ttl=REGISTRATIONS_TTL)
+@track_query()
 def fetch_recent_registrations():
     try:
-        with engine.connect() as conn:
-            query = """
-            SELECT name, plate_number, phone_number, check_in_date
-            FROM guest
-            WHERE is_approved = 1
-            ORDER BY created_at DESC
-            """
-            result = conn.execute(text(query))
+        with get_engine().connect() as conn:
+            query = (
+                select(guest.c.name, guest.c.plate_number, guest.c.phone_number, guest.c.check_in_date)
+                .where(GUEST_APPROVED)
+                .order_by(guest.c.created_at.desc())
+            )
+            result = conn.execute(query)
             df = pd.DataFrame(result.fetchall(), 
                             columns=['Name', 'Plate Number', 'Phone Number', 'Check-in Date'])
             return df
     except Exception as e:
         st.error(f"Error fetching recent registrations: {e}")
+        skip_caching()
         return pd.DataFrame()
     
 # Queries from view_vehicle_details.py
 
-def check_for_updates():
+@track_query()
+def fetch_latest_detection_marker():
+    """Return the (timestamp, vehicle_history_id) of the last detection written, or None if there are none."""
+    query = (
+        select(vh.timestamp, vh.vehicle_history_id)
+        .order_by(vh.vehicle_history_id.desc())
+        .limit(1)
+    )
+    with get_engine().connect() as conn:
+        row = conn.execute(query).fetchone()
+    return (row.timestamp, row.vehicle_history_id) if row else None
+
+def build_vehicle_detail(row):
     """
-    Check for updates in the vehicle_history table by querying the latest timestamp.
-    Only fetch new data if the latest timestamp has changed.
+    Classify a resolved detection row and return (status, detail) where status is
+    1 for registered vehicles, 2 for guests and 0 for unregistered vehicles.
+    Details also carry the approximate plate match, if the registry made one.
     """
-    with SessionLocal() as session:
-        latest_timestamp_query = text("SELECT MAX(timestamp) AS latest_timestamp FROM vehicle_history")
-        result = session.execute(latest_timestamp_query).fetchone()
-        latest_timestamp = result.latest_timestamp
+    status, detail = classify_vehicle_detail(row)
+    detail.update(
+        read_plate=getattr(row, "read_plate", None),
+        match_distance=getattr(row, "match_distance", None),
+        plate_candidates=getattr(row, "plate_candidates", []),
+    )
+    return status, detail
+
+def classify_vehicle_detail(row):
+    """Status and displayed fields of a resolved detection row."""
+    if row.guest_name is not None:
+        return 2, {
+            'guest_name': row.guest_name,
+            'plate_number': row.plate_number,
+            'phone_number': row.guest_phone_number,
+            'visit_purpose': row.visit_purpose,
+            'check_in_date': row.check_in_date.strftime('%d-%m-%Y %H:%M:%S'),
+            'check_out_date': row.check_out_date.strftime('%d-%m-%Y %H:%M:%S'),
+            'is_approved': row.is_approved
+        }
+    if row.registration_status and row.owner_name is not None:
+        return 1, {
+            'plate_number': row.plate_number,
+            'owner_name': row.owner_name,
+            'address': row.address,
+            'phone_number': row.owner_phone_number,
+            'pass_expiry_date': row.pass_expiry_date.strftime('%d-%m-%Y'),
+            'registration_status': row.registration_status,
+            'make': row.make,
+            'model': row.model,
+            'color': row.color,
+            'vehicle_type': row.vehicle_type,
+            'detection_time': row.detection_time.strftime('%d-%m-%Y %H:%M:%S')
+        }
+    return 0, {
+        'plate_number': row.plate_number,
+        'confidence': row.confidence,
+        'registration_status': row.registration_status,
+        'detection_time': row.detection_time.strftime('%d-%m-%Y %H:%M:%S')
+    }
+
+@track_query()
+def fetch_registered_vehicles():
+    """Registered vehicles with their owner details, for the plate registry."""
+    query = select(
+        registered_vehicle.c.number_plate,
+        users.c.fullname.label("owner_name"),
+        users.c.address,
+        users.c.phone_number.label("owner_phone_number"),
+        registered_vehicle.c.pass_expiry_date,
+        registered_vehicle.c.make,
+        registered_vehicle.c.model,
+        registered_vehicle.c.color,
+        registered_vehicle.c.vehicle_type,
+    ).join_from(registered_vehicle, users, registered_vehicle.c.username == users.c.username)
+    with get_engine().connect() as conn:
+        return conn.execute(query).fetchall()
 
-        if (
-            'latest_timestamp' in st.session_state 
-            and st.session_state.latest_timestamp == latest_timestamp
-        ):
-            return None, None
+@track_query()
+def fetch_guest_passes(since=None):
+    """Guest passes for the plate registry, optionally only those created at or after `since`."""
+    query = select(
+        guest.c.plate_number,
+        guest.c.name.label("guest_name"),
+        guest.c.phone_number.label("guest_phone_number"),
+        guest.c.visit_purpose,
+        guest.c.check_in_date,
+        guest.c.check_out_date,
+        guest.c.is_approved,
+        guest.c.created_at,
+    ).order_by(guest.c.created_at)
+    if since is not None:
+        query = query.where(guest.c.created_at >= since)
+    with get_engine().connect() as conn:
+        return conn.execute(query).fetchall()
 
-        st.session_state.latest_timestamp = latest_timestamp
-        return get_latest_vehicle_detail()
+@track_query()
+def fetch_distinct_plates():
+    """Every distinct plate in vehicle_history, for the plate search index."""
+    with get_engine().connect() as conn:
+        return conn.execute(select(vh.plate_number).distinct()).scalars().all()
+
+def _latest_vehicle_detail():
+    """(marker, status, vehicle_df) of the last detection written, or (None, None, None)."""
+    latest_detection = (
+        select(
+            vh.vehicle_history_id, vh.plate_number, vh.confidence, vh.registration_status,
+            vh.timestamp.label("detection_time"),
+        )
+        # The last one written, which is the newest unless a gate reported late
+        .order_by(vh.vehicle_history_id.desc())
+        .limit(1)
+    )
+    # Classification is a lookup in the in-memory plate registry, not a join
+    registry = get_plate_registry()
+    registry.ensure_fresh()
+    with get_engine().connect() as conn:
+        row = conn.execute(latest_detection).fetchone()
 
+    if not row:
+        return None, None, None
+    status, detail = build_vehicle_detail(registry.resolve(row))
+    return (row.detection_time, row.vehicle_history_id), status, pd.DataFrame([detail])
+
+@track_query()
 def get_latest_vehicle_detail():
     """
     Query and return the most recent vehicle detail from vehicle_history.
-    Handles three cases:
-    1. Registered vehicles (join with registered_vehicle and users tables)
-    2. Approved guests (join with guest table)
-    3. Unregistered vehicles
+    Only the latest detection is read; owner and guest details come from the in-memory
+    plate registry, which also resolves misreads to the nearest registered or approved plate.
     """
-    with SessionLocal() as session:
-        # Get the latest vehicle_history entry
-        latest_vehicle_query = text("""
-            SELECT TOP 1
-                vh.vehicle_history_id,
-                vh.plate_number,
-                vh.confidence,
-                vh.registration_status,
-                vh.timestamp
-            FROM vehicle_history vh
-            ORDER BY vh.timestamp DESC
-        """)
-        latest_vehicle = session.execute(latest_vehicle_query).fetchone()
-
-        if not latest_vehicle:
-            return None, None
-
-        # First check if it's a guest vehicle
-        guest_query = text("""
-            SELECT 
-                vh.plate_number,
-                g.name as guest_name,
-                g.phone_number,
-                g.email,
-                g.visit_purpose,
-                g.check_in_date,
-                g.check_out_date,
-                g.is_approved,
-                vh.timestamp as detection_time
-            FROM vehicle_history vh
-            INNER JOIN guest g ON vh.plate_number = g.plate_number
-            WHERE vh.plate_number = :plate_number
-        """)
-        guest_result = session.execute(guest_query, {'plate_number': latest_vehicle.plate_number})
-        guest_data = guest_result.fetchone()
-
-        if guest_data:
-            # It's a guest vehicle
-            return 2, pd.DataFrame([{
-                'guest_name' : guest_data.guest_name,
-                'plate_number': guest_data.plate_number,
-                'phone_number': guest_data.phone_number,
-                'visit_purpose': guest_data.visit_purpose,
-                'check_in_date': guest_data.check_in_date.strftime('%d-%m-%Y %H:%M:%S'),
-                'check_out_date': guest_data.check_out_date.strftime('%d-%m-%Y %H:%M:%S'),
-                'is_approved': guest_data.is_approved
-            }])
-        
-        # If not a guest, check if it's a registered vehicle
-        elif latest_vehicle.registration_status:
-            registered_query = text("""
-                SELECT 
-                    vh.plate_number,
-                    u.fullname as owner_name,
-                    u.address,
-                    u.phone_number,
-                    rv.pass_expiry_date,
-                    vh.registration_status,
-                    rv.make,
-                    rv.model,
-                    rv.color,
-                    rv.vehicle_type,
-                    vh.timestamp as detection_time
-                FROM vehicle_history vh
-                INNER JOIN registered_vehicle rv ON vh.plate_number = rv.number_plate
-                INNER JOIN users u ON rv.username = u.username
-                WHERE vh.plate_number = :plate_number
-            """)
-            result = session.execute(registered_query, {'plate_number': latest_vehicle.plate_number})
-            fetched_data = result.fetchall()
-            registered_vehicle_details = [
-                {
-                    **dict(row._mapping),
-                    'pass_expiry_date': row.pass_expiry_date.strftime('%d-%m-%Y'),
-                    'detection_time': row.detection_time.strftime('%d-%m-%Y %H:%M:%S')
-                }
-                for row in fetched_data
-            ]
-            return 1, pd.DataFrame(registered_vehicle_details)
-        else:
-            # Unregistered vehicle
-            return 0, pd.DataFrame([{
-                'plate_number': latest_vehicle.plate_number,
-                'confidence': latest_vehicle.confidence,
-                'registration_status': latest_vehicle.registration_status,
-                'detection_time': latest_vehicle.timestamp.strftime('%d-%m-%Y %H:%M:%S')
-            }])
+    _, status, vehicle_df = _latest_vehicle_detail()
+    return status, vehicle_df
+
+@track_query()
+def fetch_latest_vehicle_detail():
+    """
+    get_latest_vehicle_detail with the detection's marker, as (marker, status, vehicle_df).
+    The marker comes from the same row as the detail, in the form fetch_latest_detection_marker returns.
+    """
+    return _latest_vehicle_detail()
 
 # Queries from sidebar.py
 
-def fetch_pending_guests():
-    """Fetch all pending guests from guest_temp table."""
-    query = """
-    SELECT name, plate_number, vehicle_type, phone_number, visit_purpose, check_in_date, check_out_date 
-    FROM guest_temp
+@track_query()
+def fetch_pending_guest_token():
+    """Cheap change token of guest_temp: (row count, latest check-in date)."""
+    query = select(func.count(), func.max(guest_temp.c.check_in_date))
+    with get_engine().connect() as conn:
+        return tuple(conn.execute(query).one())
+
+@track_query()
+def fetch_pending_guest_ids():
+    """guest_id of every pending guest, to spot guests removed from guest_temp."""
+    with get_engine().connect() as conn:
+        return set(conn.execute(select(guest_temp.c.guest_id)).scalars())
+
+@track_query()
+def fetch_pending_guests(since=None):
+    """
+    Fetch pending guests from guest_temp table, oldest check-in first.
+    With `since`, only guests that checked in at or after it are returned.
     """
-    with engine.connect() as conn:
+    query = select(
+        guest_temp.c.guest_id,
+        guest_temp.c.name,
+        guest_temp.c.plate_number,
+        guest_temp.c.vehicle_type,
+        guest_temp.c.phone_number,
+        guest_temp.c.visit_purpose,
+        guest_temp.c.check_in_date,
+        guest_temp.c.check_out_date,
+    ).order_by(guest_temp.c.check_in_date)
+    if since is not None:
+        query = query.where(guest_temp.c.check_in_date >= since)
+    with get_engine().connect() as conn:
         try:
-            result = conn.execute(text(query)).fetchall()
-            return pd.DataFrame(result, columns=["Name", "Plate Number", "Vehicle Type", "Phone Number", "Visit Purpose", "Check-in Date", "Check-out Date"])
+            result = conn.execute(query).fetchall()
+            return pd.DataFrame(result, columns=["Guest ID", "Name", "Plate Number", "Vehicle Type", "Phone Number", "Visit Purpose", "Check-in Date", "Check-out Date"])
         except SQLAlchemyError as e:
             st.error(f"Error fetching data: {e}")
             return pd.DataFrame()
 
-def approve_guest(plate_number):
-    try:
-        with SessionLocal() as session:
-            insert_query = """
-            INSERT INTO guest (name, plate_number, id_number, phone_number, email, address, visit_purpose, check_in_date, check_out_date, is_approved)
-            SELECT name, plate_number, id_number, phone_number, email, address, visit_purpose, check_in_date, check_out_date, :is_approved
-            FROM guest_temp WHERE plate_number = :plate_number
-            """
-            delete_query = "DELETE FROM guest_temp WHERE plate_number = :plate_number"
-            session.execute(text(insert_query), {"plate_number": plate_number, "is_approved": "1"})
-            session.execute(text(delete_query), {"plate_number": plate_number})
-            session.commit()
-    except SQLAlchemyError as e:
-        session.rollback()
-        st.error(f"Error approving guest: {e}")
+# SQL Server allows at most 2100 parameters per statement
+RESOLVE_BATCH_SIZE = 1000
+
+@track_query()
+def fetch_guest_decisions(plate_numbers, since):
+    """
+    Latest guard decision per plate among guest passes created at or after `since`,
+    as {plate_number: (is_approved, created_at)}, for the guests waiting on the guest form.
+    """
+    plates = list(plate_numbers)
+    decisions = {}
+    with get_engine().connect() as conn:
+        for start in range(0, len(plates), RESOLVE_BATCH_SIZE):
+            query = (
+                select(guest.c.plate_number, guest.c.is_approved, guest.c.created_at)
+                .where(guest.c.plate_number.in_(plates[start:start + RESOLVE_BATCH_SIZE]), guest.c.created_at >= since)
+                .order_by(guest.c.created_at)
+            )
+            # Rows are oldest first, so later passes overwrite earlier ones
+            decisions.update({row.plate_number: (row.is_approved, row.created_at) for row in conn.execute(query)})
+    return decisions
+
+GUEST_PASS_COLUMNS = (
+    "name", "plate_number", "id_number", "phone_number", "email",
+    "address", "visit_purpose", "check_in_date", "check_out_date",
+)
 
-def reject_guest(plate_number):
+@track_query()
+def decide_pending_guests(guest_ids, is_approved):
+    """
+    Move the given guest_temp rows into guest with the guard's decision, in one transaction.
+    Returns the number of guests moved, or None on error; rows another guard already
+    handled are skipped.
+    """
+    guest_ids = list(guest_ids)
+    if not guest_ids:
+        return 0
     try:
         with SessionLocal() as session:
-            insert_query = """
-            INSERT INTO guest (name, plate_number, id_number, phone_number, email, address, visit_purpose, check_in_date, check_out_date, is_approved)
-            SELECT name, plate_number, id_number, phone_number, email, address, visit_purpose, check_in_date, check_out_date, :is_approved
-            FROM guest_temp WHERE plate_number = :plate_number
-            """
-            delete_query = "DELETE FROM guest_temp WHERE plate_number = :plate_number"
-            session.execute(text(insert_query), {"plate_number": plate_number, "is_approved": "0"})
-            session.execute(text(delete_query), {"plate_number": plate_number})
+            # Only rows this transaction deletes are moved; a guard deciding the same guest at
+            # once deletes nothing (OUTPUT DELETED on SQL Server, RETURNING elsewhere)
+            moved = session.execute(
+                delete(guest_temp)
+                .where(guest_temp.c.guest_id.in_(guest_ids))
+                .returning(*(guest_temp.c[name] for name in GUEST_PASS_COLUMNS))
+            ).mappings().all()
+            if moved:
+                session.execute(insert(guest), [{**row, "is_approved": is_approved} for row in moved])
             session.commit()
     except SQLAlchemyError as e:
-        session.rollback()
-        st.error(f"Error rejecting guest: {e}")
-        
-        
+        st.error(f"Error {'approving' if is_approved else 'rejecting'} guests: {e}")
+        return None
+    finally:
+        invalidate_queries(*GUEST_QUERIES)
+        get_pending_guest_feed().invalidate()
+        get_plate_registry().invalidate()
+
+    verifier = get_guest_verifier()
+    for row in moved:
+        verifier.notify(row["plate_number"], is_approved)
+    return len(moved)
+
+def approve_guests(guest_ids):
+    return decide_pending_guests(guest_ids, True)
+
+def reject_guests(guest_ids):
+    return decide_pending_guests(guest_ids, False)
+
+
 # Queries from analytics.py
 
-def get_total_vehicles_today(conn):
-    query = """
-    SELECT COUNT(DISTINCT plate_number) as total
-    FROM vehicle_history
-    WHERE CAST(timestamp AS DATE) = CAST(GETDATE() AS DATE)
+def today_range():
+    """Half-open [today, tomorrow) datetime range, so filters on timestamp columns can use an index."""
+    day_start = datetime.combine(date.today(), time.min)
+    return {"day_start": day_start, "day_end": day_start + timedelta(days=1)}
+
+@cached_query(ttl=ANALYTICS_TTL, skip_args=1)
+@track_query()
+def get_todays_traffic_summary(conn):
     """
-    result = conn.execute(text(query)).fetchone()
-    return result.total
-
-def get_unauthorized_attempts(conn):
-    query = """
-    SELECT COUNT(DISTINCT plate_number) as total
-    FROM vehicle_history
-    WHERE registration_status = 0
-    AND CAST(timestamp AS DATE) = CAST(GETDATE() AS DATE)
+    Today's dashboard figures from one scan of vehicle_history:
+    total detections, distinct plates, distinct unauthorized plates, the per-hour
+    histogram and the peak hour.
     """
-    result = conn.execute(text(query)).fetchone()
-    return result.total
+    hour = extract("hour", vh.timestamp)
+    today = today_range()
+    query = (
+        select(hour.label("hour"), vh.plate_number, vh.registration_status, func.count().label("detections"))
+        .where(vh.timestamp >= today["day_start"], vh.timestamp < today["day_end"])
+        .group_by(hour, vh.plate_number, vh.registration_status)
+    )
+    buckets = pd.DataFrame(
+        conn.execute(query).fetchall(),
+        columns=["hour", "plate_number", "registration_status", "detections"],
+    )
+    hourly = (
+        buckets.groupby("hour", as_index=False)["detections"].sum()
+        .rename(columns={"detections": "count"})
+        .sort_values("hour")
+        .reset_index(drop=True)
+    )
+    peak_hour = "N/A"
+    if not hourly.empty:
+        peak_hour = f"{int(hourly.loc[hourly['count'].idxmax(), 'hour']):02d}:00"
+    return {
+        "total_detections": int(buckets["detections"].sum()),
+        "total_vehicles": buckets["plate_number"].nunique(),
+        "unauthorized": buckets.loc[buckets["registration_status"] == 0, "plate_number"].nunique(),
+        "hourly": hourly,
+        "peak_hour": peak_hour,
+    }
 
+@cached_query(ttl=ANALYTICS_TTL, skip_args=1)
+@track_query()
 def get_guest_passes_issued(conn):
-    query = """
-    SELECT COUNT(*) as total
-    FROM guest
-    WHERE is_approved = 1
-    AND CAST(created_at AS DATE) = CAST(GETDATE() AS DATE)
-    """
-    result = conn.execute(text(query)).fetchone()
-    return result.total
-
-def get_peak_hour_traffic(conn):
-    query = """
-    SELECT 
-        DATEPART(HOUR, timestamp) as hour,
-        COUNT(*) as traffic_count
-    FROM vehicle_history
-    WHERE CAST(timestamp AS DATE) = CAST(GETDATE() AS DATE)
-    GROUP BY DATEPART(HOUR, timestamp)
-    ORDER BY traffic_count DESC
-    """
-    result = conn.execute(text(query)).fetchone()
-    return f"{result.hour:02d}:00" if result else "N/A"
+    today = today_range()
+    query = select(func.count().label("total")).where(
+        GUEST_APPROVED,
+        guest.c.created_at >= today["day_start"],
+        guest.c.created_at < today["day_end"],
+    )
+    return conn.execute(query).scalar()
 
+@cached_query(ttl=ANALYTICS_TTL, skip_args=1)
+@track_query()
 def get_vehicle_trends(conn):
-    query = """
-    SELECT 
-        CAST(timestamp AS DATE) as date,
-        COUNT(plate_number) as total_vehicles,
-        SUM(CASE WHEN registration_status = 0 THEN 1 ELSE 0 END) as unauthorized,
-        SUM(CASE WHEN registration_status = 1 THEN 1 ELSE 0 END) as authorized
-    FROM vehicle_history
-    WHERE timestamp >= DATEADD(day, -7, GETDATE())
-    GROUP BY CAST(timestamp AS DATE)
-    ORDER BY date
-    """
-    return pd.read_sql(query, conn)
-
-def get_hourly_distribution(conn):
-    query = """
-    SELECT 
-        DATEPART(HOUR, timestamp) as hour,
-        COUNT(*) as count
-    FROM vehicle_history
-    WHERE CAST(timestamp AS DATE) = CAST(GETDATE() AS DATE)
-    GROUP BY DATEPART(HOUR, timestamp)
-    ORDER BY hour
-    """
+    day = calendar_date(vh.timestamp)
+    query = (
+        select(
+            day.label("date"),
+            func.count(vh.plate_number).label("total_vehicles"),
+            func.sum(case((vh.registration_status == 0, 1), else_=0)).label("unauthorized"),
+            func.sum(case((vh.registration_status == 1, 1), else_=0)).label("authorized"),
+        )
+        .where(vh.timestamp >= datetime.now() - timedelta(days=7))
+        .group_by(day)
+        .order_by(day)
+    )
     return pd.read_sql(query, conn)
 
+@cached_query(ttl=ANALYTICS_TTL, skip_args=1)
+@track_query()
 def get_todays_vehicle_history(conn):
-    query = """
-    SELECT 
-        plate_number,
-        confidence,
-        timestamp,
-        CASE WHEN registration_status = 1 THEN 'Registered' ELSE 'Unregistered' END as status
-    FROM vehicle_history
-    WHERE CAST(timestamp AS DATE) = CAST(GETDATE() AS DATE)
-    ORDER BY timestamp DESC
-    """
+    today = today_range()
+    query = (
+        select(
+            vh.plate_number,
+            vh.confidence,
+            vh.timestamp,
+            case((vh.registration_status == 1, "Registered"), else_="Unregistered").label("status"),
+        )
+        .where(vh.timestamp >= today["day_start"], vh.timestamp < today["day_end"])
+        .order_by(vh.timestamp.desc())
+    )
     return pd.read_sql(query, conn)
 
+@cached_query(ttl=ANALYTICS_TTL, skip_args=1)
+@track_query()
 def get_todays_guests(conn):
-    query = """
-    SELECT 
-        name,
-        plate_number,
-        phone_number,
-        visit_purpose,
-        check_in_date,
-        check_out_date,
-        CASE WHEN is_approved = 1 THEN 'Approved' ELSE 'Rejected' END as status
-    FROM guest
-    WHERE CAST(created_at AS DATE) = CAST(GETDATE() AS DATE)
-    ORDER BY created_at DESC
-    """
+    today = today_range()
+    query = (
+        select(
+            guest.c.name,
+            guest.c.plate_number,
+            guest.c.phone_number,
+            guest.c.visit_purpose,
+            guest.c.check_in_date,
+            guest.c.check_out_date,
+            case((GUEST_APPROVED, "Approved"), else_="Rejected").label("status"),
+        )
+        .where(guest.c.created_at >= today["day_start"], guest.c.created_at < today["day_end"])
+        .order_by(guest.c.created_at.desc())
+    )
     return pd.read_sql(query, conn)
 
+
+# Queries from ingest.py
+
+@track_query()
+def insert_detections(rows):
+    """
+    Write detections (dicts of vehicle_history columns) in one transaction. On SQL Server
+    SQLAlchemy's "insertmanyvalues" sends the executemany as multi-row INSERTs that stay
+    under the 2100-parameter limit; other drivers use their native executemany.
+    """
+    with get_engine().begin() as conn:
+        conn.execute(insert(vehicle_history), rows)
+    return len(rows)
@@ -0,0 +1,435 @@
+"""
+Ingestion of VNPR detections into vehicle_history.
+
+Gates hand detection events to a DetectionIngestor, in process through submit() or over
+HTTP through the listener. Events wait in a bounded queue, which pushes back on producers
+when the database falls behind. A single flush thread classifies them against the plate
+registry and writes them with multi-row INSERTs every flush interval, so any number of
+gates share one connection and one transaction per batch.
+
+Rows keep the time the gate read the plate. A detection resent after a 503 or sent by a
+slow gate can therefore be older than rows already written; the tail cache, rollups,
+detection poller and plate search follow vehicle_history_id rather than the timestamp,
+so they still pick it up. How far each gate's reads lag behind their writes is reported
+in its counters.
+
+Writes failing for transient reasons (lost connection, timeout, lock) are retried until
+they succeed. Any other failure is blamed on the rows: the batch is halved until the bad
+ones are isolated, and those are appended to the rejects file instead of blocking the gates.
+
+    python -m app.ingest serve --port 8502
+    curl -X POST localhost:8502/detections -d '{"gate": "main", "plate_number": "SAB1234A", "confidence": 0.97}'
+    python -m app.ingest replay recorded.csv
+"""
+import argparse
+import csv
+import json
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from app import settings
+from app.schema import vehicle_history
+
+logger = logging.getLogger(__name__)
+
+MAX_PLATE_LENGTH = vehicle_history.c.plate_number.type.length
+# Transiently failed writes are retried, waiting up to this long between attempts
+RETRY_MAX_SECONDS = 30.0
+# Failures worth retrying as they are; anything else is blamed on the rows being written
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, DisconnectionError, PoolTimeoutError)
+# Seconds an HTTP request waits for queue space before the gate is told to retry
+HTTP_SUBMIT_TIMEOUT = 1.0
+# Window the per-gate write rate is measured over
+RATE_WINDOW_SECONDS = 10.0
+
+
+def _parse_timestamp(value):
+    """Naive local time, like the rest of vehicle_history; offsets are converted, not dropped."""
+    if value in (None, ""):
+        return datetime.now()
+    timestamp = value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+@dataclass
+class Detection:
+    """One plate read by a gate camera, at `timestamp` by the gate's clock."""
+    plate_number: str
+    confidence: float = None
+    gate: str = "unknown"
+    timestamp: datetime = field(default_factory=datetime.now)
+
+    @classmethod
+    def from_dict(cls, data, gate=None):
+        """
+        Detection from a JSON object or CSV record. Keys may also be written like the
+        history export's headers ("Plate Number"). Raises ValueError if it is invalid.
+        """
+        data = {str(key).strip().lower().replace(" ", "_"): value for key, value in data.items()}
+        plate = str(data.get("plate_number") or "").strip()
+        if not plate or len(plate) > MAX_PLATE_LENGTH:
+            raise ValueError(f"Invalid plate_number: {plate!r}")
+        confidence = data.get("confidence")
+        confidence = float(confidence) if confidence not in (None, "") else None
+        if confidence is not None and not 0 <= confidence <= 1:
+            raise ValueError(f"Confidence must be between 0 and 1: {confidence}")
+        return cls(
+            plate_number=plate,
+            confidence=confidence,
+            gate=str(data.get("gate") or gate or "unknown"),
+            timestamp=_parse_timestamp(data.get("timestamp")),
+        )
+
+
+def is_transient(error):
+    """Whether a failed write may succeed as it is on retry, rather than failing on its rows."""
+    if isinstance(error, DBAPIError) and error.connection_invalidated:
+        return True
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+@dataclass
+class GateCounters:
+    """
+    Events of one gate: accepted into the queue, written, turned away while it was full,
+    and set aside in the rejects file because they could not be written.
+    """
+    received: int = 0
+    written: int = 0
+    rejected: int = 0
+    set_aside: int = 0
+    # Seconds between the gate reading the plates of the last batch and writing them, at most
+    delay_seconds: float = 0.0
+    recent_writes: deque = field(default_factory=deque)
+
+    def rate(self, now):
+        """Detections written per second over the last RATE_WINDOW_SECONDS."""
+        while self.recent_writes and now - self.recent_writes[0][0] > RATE_WINDOW_SECONDS:
+            self.recent_writes.popleft()
+        return sum(count for _, count in self.recent_writes) / RATE_WINDOW_SECONDS
+
+
+class DetectionIngestor:
+    """
+    Bounded queue of detections drained by one flush thread. Each flush writes up to
+    `batch_size` detections, as soon as that many are queued or `flush_interval` seconds
+    after the first one arrived. Transiently failed writes are retried with backoff while
+    the queue fills up and pushes back on the gates; detections that can't be written at
+    all are set aside in the rejects file. Either way no accepted detection is dropped.
+    """
+
+    def __init__(self, queue_size=settings.INGEST_QUEUE_SIZE, batch_size=settings.INGEST_BATCH_SIZE,
+                 flush_interval=settings.INGEST_FLUSH_SECONDS, rejects_path=settings.INGEST_REJECTS_FILE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rejects_path = rejects_path
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.batches = 0
+        self.failed_writes = 0
+        self.last_error = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="detection-ingest", daemon=True)
+                self._thread.start()
+        return self
+
+    def _gate(self, gate):
+        return self._counters.setdefault(gate, GateCounters())
+
+    def submit(self, detection, timeout=None):
+        """
+        Queue a detection. While the queue is full this blocks for up to `timeout` seconds
+        (None waits indefinitely, 0 not at all). Returns False if it was turned away.
+        """
+        self.start()
+        try:
+            self._queue.put(detection, block=timeout != 0, timeout=timeout or None)
+        except queue.Full:
+            with self._lock:
+                self._gate(detection.gate).rejected += 1
+            return False
+        with self._lock:
+            self._gate(detection.gate).received += 1
+        return True
+
+    def flush(self):
+        """Wait until every queued detection has been written."""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the flush thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._collect()
+            if batch:
+                self._flush(batch)
+
+    def _collect(self):
+        """Queued detections, once the batch is full or the flush interval has passed."""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _flush(self, batch):
+        """
+        Write a batch. Transient failures are retried with backoff; on any other failure the
+        batch is halved until the rows causing it are isolated and set aside.
+        """
+        chunks = [batch]
+        retry_delay = self.flush_interval
+        while chunks:
+            chunk = chunks.pop()
+            try:
+                self._write(chunk)
+            except Exception as e:
+                with self._lock:
+                    self.failed_writes += 1
+                    self.last_error = e
+                if is_transient(e):
+                    logger.warning("Writing %d detections failed, retrying in %.1fs: %s", len(chunk), retry_delay, e)
+                    time.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, RETRY_MAX_SECONDS)
+                    chunks.append(chunk)
+                    continue
+                if len(chunk) > 1:
+                    # Popped from the end, so the first half is written first
+                    middle = len(chunk) // 2
+                    chunks += [chunk[middle:], chunk[:middle]]
+                    continue
+                self._set_aside(chunk[0], e)
+            retry_delay = self.flush_interval
+            for _ in chunk:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        """Classify a batch against the plate registry and insert it."""
+        from app.database import insert_detections
+        from app.utils.plate_registry import get_plate_registry
+
+        registry = get_plate_registry()
+        registry.ensure_fresh()
+        rows = [
+            {
+                "plate_number": detection.plate_number,
+                "confidence": detection.confidence,
+                "timestamp": detection.timestamp,
+                "registration_status": 1 if registry.lookup(detection.plate_number)[1] is not None else 0,
+            }
+            for detection in batch
+        ]
+        insert_detections(rows)
+
+        written_at = datetime.now()
+        now = time.monotonic()
+        written, delays = {}, {}
+        for detection in batch:
+            written[detection.gate] = written.get(detection.gate, 0) + 1
+            delay = (written_at - detection.timestamp).total_seconds()
+            delays[detection.gate] = max(delays.get(detection.gate, delay), delay)
+        with self._lock:
+            self.batches += 1
+            for gate, count in written.items():
+                counters = self._gate(gate)
+                counters.written += count
+                counters.delay_seconds = delays[gate]
+                counters.recent_writes.append((now, count))
+
+    def _set_aside(self, detection, error):
+        """Append a detection that cannot be written to the rejects file, so it is kept for review."""
+        logger.error("Setting aside detection %s from gate %s: %s", detection.plate_number, detection.gate, error)
+        with self._lock:
+            self._gate(detection.gate).set_aside += 1
+        if not self.rejects_path:
+            return
+        record = {
+            "gate": detection.gate,
+            "plate_number": detection.plate_number,
+            "confidence": detection.confidence,
+            "timestamp": detection.timestamp.isoformat(),
+            "error": str(error).strip().splitlines()[0] if str(error).strip() else type(error).__name__,
+        }
+        try:
+            with open(self.rejects_path, "a") as rejects:
+                rejects.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.error("Could not write to %s: %s", self.rejects_path, e)
+
+    def stats(self):
+        """Queue depth, batch counts and per-gate counters and write rates."""
+        now = time.monotonic()
+        with self._lock:
+            gates = {
+                gate: {
+                    "received": counters.received,
+                    "written": counters.written,
+                    "rejected": counters.rejected,
+                    "set_aside": counters.set_aside,
+                    "delay_seconds": round(counters.delay_seconds, 1),
+                    "written_per_second": round(counters.rate(now), 1),
+                }
+                for gate, counters in sorted(self._counters.items())
+            }
+        return {
+            "queued": self._queue.qsize(),
+            "batches": self.batches,
+            "failed_writes": self.failed_writes,
+            "gates": gates,
+        }
+
+
+class IngestRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /detections with one JSON detection or a list of them; answers 202 once all are
+    queued, or 503 with the number accepted when the queue stayed full. GET /stats.
+    """
+
+    def _reply(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/detections":
+            self._reply(404, {"error": "Not found"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            events = payload if isinstance(payload, list) else [payload]
+            detections = [Detection.from_dict(event) for event in events]
+        except (ValueError, TypeError, AttributeError) as e:
+            self._reply(400, {"error": str(e)})
+            return
+
+        ingestor = self.server.ingestor
+        accepted = 0
+        for detection in detections:
+            if not ingestor.submit(detection, timeout=HTTP_SUBMIT_TIMEOUT):
+                break
+            accepted += 1
+        if accepted < len(detections):
+            # The gate resends the detections from `accepted` on
+            self._reply(503, {"accepted": accepted}, {"Retry-After": "1"})
+        else:
+            self._reply(202, {"accepted": accepted})
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/stats":
+            self._reply(404, {"error": "Not found"})
+            return
+        self._reply(200, self.server.ingestor.stats())
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+def create_server(ingestor, host=settings.INGEST_HOST, port=settings.INGEST_PORT):
+    """HTTP listener feeding `ingestor`; call serve_forever() on it."""
+    server = ThreadingHTTPServer((host, port), IngestRequestHandler)
+    server.daemon_threads = True
+    server.ingestor = ingestor.start()
+    return server
+
+
+def read_detections(path, gate=None):
+    """Detections recorded in a JSON-lines file (.jsonl, .ndjson) or a CSV file with a header row."""
+    with open(path, newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    yield Detection.from_dict(json.loads(line), gate)
+        else:
+            for record in csv.DictReader(f):
+                yield Detection.from_dict(record, gate)
+
+
+def replay(path, ingestor, gate=None):
+    """
+    Push recorded detections through `ingestor` as fast as it accepts them, for load testing.
+    They keep their recorded timestamps. Returns (detections, seconds) once all are written.
+    """
+    started = time.perf_counter()
+    count = 0
+    for detection in read_detections(path, gate):
+        # Blocks while the queue is full, so the replay runs at the speed of the writes
+        ingestor.submit(detection)
+        count += 1
+    ingestor.flush()
+    return count, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest VNPR detections into vehicle_history.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Accept detections over HTTP")
+    serve_parser.add_argument("--host", default=settings.INGEST_HOST)
+    serve_parser.add_argument("--port", type=int, default=settings.INGEST_PORT)
+
+    replay_parser = subparsers.add_parser("replay", help="Write recorded detections at full speed")
+    replay_parser.add_argument("path", help="CSV or JSON-lines file of detections")
+    replay_parser.add_argument("--gate", help="Gate for records that don't name one")
+
+    for subparser in (serve_parser, replay_parser):
+        subparser.add_argument("--batch-size", type=int, default=settings.INGEST_BATCH_SIZE)
+        subparser.add_argument("--flush-interval", type=float, default=settings.INGEST_FLUSH_SECONDS)
+        subparser.add_argument("--queue-size", type=int, default=settings.INGEST_QUEUE_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    ingestor = DetectionIngestor(args.queue_size, args.batch_size, args.flush_interval)
+
+    if args.command == "replay":
+        count, seconds = replay(args.path, ingestor, args.gate)
+        ingestor.close()
+        print(f"Wrote {count:,} detections in {seconds:.2f}s ({count / seconds if seconds else 0:,.0f}/s)")
+        print(json.dumps(ingestor.stats(), indent=2))
+        return
+
+    server = create_server(ingestor, args.host, args.port)
+    logger.info("Listening for detections on http://%s:%d/detections", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        ingestor.close()
+        logger.info("Stopped: %s", json.dumps(ingestor.stats()))
+
+
+if __name__ == "__main__":
+    main()
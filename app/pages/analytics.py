@@ -1,11 +1,27 @@
+import io
 import streamlit as st
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime
 import plotly.graph_objects as go
-from streamlit_autorefresh import st_autorefresh
-from app.database import get_total_vehicles_today, get_unauthorized_attempts, get_guest_passes_issued, get_peak_hour_traffic, get_vehicle_trends, get_hourly_distribution, get_todays_vehicle_history, get_todays_guests
+from app.database import (
+    get_todays_traffic_summary, get_guest_passes_issued, get_vehicle_trends, get_todays_vehicle_history,
+    get_todays_guests, with_connection,
+)
+from app.utils.concurrent_queries import get_query_executor
+from app.utils.history_cache import get_history_cache
+from app.utils.rollups import WINDOWS, get_rollup_store, window_range
+from app.utils.query_cache import query_cache
+from app.utils.metrics import track_page
+from app.utils.refresh import frame_version, live_fragment, refresh_view
 
-def create_trend_chart(df):
+# Built reports are reused while the data version is unchanged
+REPORT_CACHE_TTL = 3600
+
+DEFAULT_TREND_WINDOW = "Last 7 Days"
+DEFAULT_HOURLY_WINDOW = "Today"
+
+def create_trend_chart(df, window="Last 7 Days"):
     fig = go.Figure()
     
     fig.add_trace(go.Scatter(
@@ -30,7 +46,7 @@ def create_trend_chart(df):
     ))
     
     fig.update_layout(
-        title='Vehicle Access Trends (Last 7 Days)',
+        title=f'Vehicle Access Trends ({window})',
         xaxis_title='Date',
         yaxis_title='Number of Vehicles',
         hovermode='x unified',
@@ -40,7 +56,7 @@ def create_trend_chart(df):
     
     return fig
 
-def create_hourly_distribution_chart(df):
+def create_hourly_distribution_chart(df, window="Today"):
     fig = go.Figure()
     
     fig.add_trace(go.Bar(
@@ -50,7 +66,7 @@ def create_hourly_distribution_chart(df):
     ))
     
     fig.update_layout(
-        title='Hourly Traffic Distribution (Today)',
+        title=f'Hourly Traffic Distribution ({window})',
         xaxis_title='Hour of Day',
         yaxis_title='Number of Vehicles',
         template='plotly_white',
@@ -60,9 +76,25 @@ def create_hourly_distribution_chart(df):
     
     return fig
 
+def load_todays_vehicle_history():
+    """Today's detections from the shared tail cache, falling back to the database."""
+    history_cache = get_history_cache()
+    history_cache.refresh()
+    today_start = datetime.combine(date.today(), datetime.min.time())
+    rows = history_cache.rows_since(today_start)
+    if rows is None:
+        return with_connection(get_todays_vehicle_history)
+    return pd.DataFrame({
+        'plate_number': rows['Plate Number'],
+        'confidence': rows['Confidence'],
+        'timestamp': rows['Timestamp'],
+        'status': rows['Registration Status'].astype(int).map({1: 'Registered', 0: 'Unregistered'}),
+    })
+
 def generate_excel_report(trends_data, hourly_data, vehicle_history, guests_data):
-    # Create Excel writer object
-    output = pd.ExcelWriter('scvacs_vehicle_report.xlsx', engine='xlsxwriter')
+    # Build the workbook in memory so concurrent sessions never share a file
+    buffer = io.BytesIO()
+    output = pd.ExcelWriter(buffer, engine='xlsxwriter')
     
     # Write each dataframe to a different worksheet
     trends_data.to_excel(output, sheet_name='Weekly Trends', index=False)
@@ -93,81 +125,192 @@ def generate_excel_report(trends_data, hourly_data, vehicle_history, guests_data
                                  {'type': 'text', 'criteria': 'containing', 'value': 'Rejected', 'format': rejected_format})
 
     # Auto-adjust column widths
-    for i, col in enumerate(guests_data.columns):
-        max_len = max(guests_data[col].astype(str).apply(len).max(), len(col)) + 2
-        worksheet.set_column(i, i, max_len)
+    cell_widths = guests_data.astype(str).apply(lambda col: col.str.len().max()).fillna(0)
+    header_widths = guests_data.columns.str.len()
+    for i, max_len in enumerate(np.maximum(cell_widths.to_numpy(), header_widths) + 2):
+        worksheet.set_column(i, i, int(max_len))
 
     output.close()
+    return buffer.getvalue()
+
+def get_excel_report(data_version, trends_data, hourly_data, vehicle_history, guests_data):
+    """Return the report workbook, rebuilding it only when the underlying data version changes."""
+    key = ("excel_report", data_version)
+    found, excel_data = query_cache.get(key)
+    if not found:
+        excel_data = generate_excel_report(trends_data, hourly_data, vehicle_history, guests_data)
+        query_cache.set(key, excel_data, REPORT_CACHE_TTL)
+    return excel_data
+
+def report_data_version(trend_window, hourly_window, guests_data):
+    """Identifies the report contents: latest detection watermark, today's guests and chart windows."""
+    guests_hash = int(pd.util.hash_pandas_object(guests_data, index=False).sum())
+    return (date.today(), get_history_cache().watermark, guests_hash, trend_window, hourly_window)
+
+
+def load_chart_data(trend_window, hourly_window):
+    """Trend and hourly chart data for the selected windows, from the hourly rollups."""
+    rollup_store = get_rollup_store()
+    rollup_store.update()
+    return (
+        rollup_store.daily_trends(*window_range(trend_window)),
+        rollup_store.hourly_distribution(*window_range(hourly_window)),
+    )
+
+def load_charts(trend_window, hourly_window):
+    """
+    (trend window, hourly window, trends, hourly, rollup error) for the charts.
+    If the rollups are unavailable the default windows are answered from the raw table.
+    """
+    try:
+        return (trend_window, hourly_window, *load_chart_data(trend_window, hourly_window), None)
+    except Exception as e:
+        summary = with_connection(get_todays_traffic_summary)
+        trends_data = with_connection(get_vehicle_trends)
+        return (DEFAULT_TREND_WINDOW, DEFAULT_HOURLY_WINDOW, trends_data, summary["hourly"], e)
+
+def load_metric_cards():
+    """Today's summary and guest passes, queried at once on separate connections."""
+    batch = get_query_executor().submit({
+        "summary": lambda: with_connection(get_todays_traffic_summary),
+        "guest_passes": lambda: with_connection(get_guest_passes_issued),
+    })
+    return batch.outcome("summary"), batch.outcome("guest_passes")
+
+def metric_cards_version(cards):
+    summary, guest_passes = cards
+    totals = {field: summary.value[field] for field in ("total_vehicles", "unauthorized", "peak_hour")} if summary.ok else None
+    return (totals, guest_passes.value)
+
+def metric_cards_complete(cards):
+    # Cards still loading are retried on the next run rather than kept for the whole interval
+    return not any(outcome.timed_out for outcome in cards)
+
+def charts_version(charts):
+    if not charts.ok:
+        return None
+    trend_window, hourly_window, trends_data, hourly_data, error = charts.value
+    return (frame_version(trends_data), frame_version(hourly_data), error is None)
+
+def render_card(title, outcome, field=None):
+    """Metric card showing a query result, or a placeholder if it failed or is still running."""
+    with st.container(border=True):
+        st.markdown(f"### {title}")
+        if outcome.ok:
+            value = outcome.value[field] if field else outcome.value
+            st.markdown(f"## {value}")
+        elif outcome.timed_out:
+            st.markdown("## …")
+            st.caption("Still loading")
+        else:
+            st.markdown("## –")
+            st.caption(f"Error: {outcome.error}")
+
+def render_late(column, what):
+    column.info(f"⏳ {what} is taking longer than usual and will appear on the next refresh.")
+
+@live_fragment("analytics_cards")
+def render_metric_cards():
+    """Metric cards, rerun on their own as a fragment without rerunning the charts or report."""
+    # Cards all come from one scan of today's detections plus the guest pass count
+    summary, guest_passes = refresh_view(
+        "analytics_cards", load_metric_cards, version=metric_cards_version, complete=metric_cards_complete
+    )
+
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        render_card("🚗 Total Vehicles", summary, "total_vehicles")
+    
+    with col2:
+        render_card("⚠️ Unauthorized", summary, "unauthorized")
+    
+    with col3:
+        render_card("📝 Guest Passes", guest_passes)
     
-    with open('scvacs_vehicle_report.xlsx', 'rb') as f:
-        return f.read()
+    with col4:
+        render_card("⏰ Peak Hour", summary, "peak_hour")
+
+@live_fragment("analytics_charts")
+def render_charts(trend_window, hourly_window):
+    """Trend and hourly charts, rerun on their own as a fragment."""
+    # Charts are answered from the hourly rollups, falling back to the raw table
+    charts = refresh_view(
+        "analytics_charts",
+        lambda: get_query_executor().submit({"charts": lambda: load_charts(trend_window, hourly_window)}).outcome("charts"),
+        version=charts_version,
+        key=(trend_window, hourly_window),
+        complete=lambda charts: not charts.timed_out,
+    )
+    col1, col2 = st.columns(2)
+    if not charts.ok:
+        if charts.error is not None:
+            st.warning(f"Charts could not be loaded: {str(charts.error)}")
+        render_late(col1, "The trend chart")
+        render_late(col2, "The hourly chart")
+        return
+
+    trend_window, hourly_window, trends_data, hourly_data, error = charts.value
+    if error is not None:
+        st.warning(f"Rollups unavailable, showing live data: {str(error)}")
+
+    # Vehicle trends over time
+    col1.plotly_chart(create_trend_chart(trends_data, trend_window), use_container_width=True)
 
+    # Hourly distribution
+    col2.plotly_chart(create_hourly_distribution_chart(hourly_data, hourly_window), use_container_width=True)
 
+def render_report_section(trend_window, hourly_window):
+    """Complete Excel report; its data is only loaded once a download is requested."""
+    if st.button("📄 Prepare Complete Report", key="prepare_report"):
+        st.session_state.report_requested = True
+
+    if not st.session_state.get("report_requested"):
+        return
+
+    # Every input runs at once on its own connection
+    outcomes = get_query_executor().run({
+        "charts": lambda: load_charts(trend_window, hourly_window),
+        "vehicle_history": load_todays_vehicle_history,
+        "guests": lambda: with_connection(get_todays_guests),
+    })
+    for name, what in (("charts", "The chart data"), ("vehicle_history", "Today's vehicle history"), ("guests", "Today's guest list")):
+        if outcomes[name].error is not None:
+            st.warning(f"{what} could not be loaded: {outcomes[name].error}")
+    if not all(outcome.ok for outcome in outcomes.values()):
+        st.info("The complete report will be available once all data has loaded.")
+        return
+
+    trend_window, hourly_window, trends_data, hourly_data, error = outcomes["charts"].value
+    vehicle_history, guests_data = outcomes["vehicle_history"].value, outcomes["guests"].value
+    data_version = report_data_version(trend_window, hourly_window, guests_data)
+    excel_data = get_excel_report(data_version, trends_data, hourly_data, vehicle_history, guests_data)
+    st.download_button(
+        label="📥 Download Complete Report",
+        data=excel_data,
+        file_name=f"scvacs_vehicle_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
+        mime="application/vnd.ms-excel",
+        on_click=lambda: st.session_state.update(report_requested=False),
+    )
+
+
+@track_page("Analytics")
 def render_page():
     st.title("📊 Analytics Dashboard")
     
-    # Auto refresh every 30 seconds
-    st_autorefresh(interval=30000, key="analytics_refresh")
-    
     try:
-        from app.database import engine
-        
-        with engine.connect() as conn:
-            # Metrics Row with cards
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                with st.container(border=True):
-                    st.markdown("### 🚗 Total Vehicles")
-                    value = get_total_vehicles_today(conn)
-                    st.markdown(f"## {value}")
-            
-            with col2:
-                with st.container(border=True):
-                    st.markdown("### ⚠️ Unauthorized")
-                    value = get_unauthorized_attempts(conn)
-                    st.markdown(f"## {value}")
-            
-            with col3:
-                with st.container(border=True):
-                    st.markdown("### 📝 Guest Passes")
-                    value = get_guest_passes_issued(conn)
-                    st.markdown(f"## {value}")
-            
-            with col4:
-                with st.container(border=True):
-                    st.markdown("### ⏰ Peak Hour")
-                    value = get_peak_hour_traffic(conn)
-                    st.markdown(f"## {value}")
-            
-         
-            col1, col2 = st.columns(2)
-            
-            # Vehicle trends over time
-            trends_data = get_vehicle_trends(conn)
-            trend_chart = create_trend_chart(trends_data)
-            col1.plotly_chart(trend_chart, use_container_width=True)
-            
-            # Hourly distribution
-            hourly_data = get_hourly_distribution(conn)
-            hourly_chart = create_hourly_distribution_chart(hourly_data)
-            col2.plotly_chart(hourly_chart, use_container_width=True)
-            
-            # Get data for tables and download
-            vehicle_history = get_todays_vehicle_history(conn)
-            guests_data = get_todays_guests(conn)
-            
-            # Download button
-            excel_data = generate_excel_report(trends_data, hourly_data, vehicle_history, guests_data)
-            st.download_button(
-                label="📥 Download Complete Report",
-                data=excel_data,
-                file_name=f"scvacs_vehicle_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                mime="application/vnd.ms-excel",
-            )
-                        
+        # Cards and charts refresh independently; the report only loads on request
+        render_metric_cards()
+
+        col1, col2 = st.columns(2)
+        trend_window = col1.selectbox("Trend Window", list(WINDOWS), index=list(WINDOWS).index(DEFAULT_TREND_WINDOW), key="trend_window")
+        hourly_window = col2.selectbox("Distribution Window", list(WINDOWS), index=list(WINDOWS).index(DEFAULT_HOURLY_WINDOW), key="hourly_window")
+        render_charts(trend_window, hourly_window)
+
+        render_report_section(trend_window, hourly_window)
+                    
     except Exception as e:
         st.error(f"Error loading analytics: {str(e)}")
 
 if __name__ == "__main__":
-    render_page()
\ No newline at end of file
+    render_page()
@@ -1,27 +1,19 @@
 import streamlit as st
-import time
-import os
-import base64
+import uuid
 from datetime import datetime, timedelta
-from sqlalchemy import Column, String, DateTime, text
-from sqlalchemy.dialects.mssql import UNIQUEIDENTIFIER
+from sqlalchemy import text
 from app.database import Base, SessionLocal
-from sqlalchemy.exc import SQLAlchemyError
+from app.schema import guest_temp
+from app.utils.pending_guests import get_pending_guest_feed
+from app.utils.guest_verification import get_guest_verifier
+from app.utils.metrics import track_page
+from app.utils.assets import render_logo
+
+# Longest a single wait for the guard's decision blocks before the progress bar advances
+VERIFICATION_WAIT_SECONDS = 2
 
 class GuestTemp(Base):
-    __tablename__ = "guest_temp"
-    
-    guest_id = Column(UNIQUEIDENTIFIER, primary_key=True, server_default=text('NEWID()'))
-    name = Column(String(255), nullable=False)
-    plate_number = Column(String(50), nullable=False)
-    vehicle_type = Column(String(30))
-    id_number = Column(String(50), nullable=False)
-    phone_number = Column(String(15))
-    email = Column(String(100))
-    address = Column(String(100))
-    visit_purpose = Column(String(255))
-    check_in_date = Column(DateTime)
-    check_out_date = Column(DateTime)
+    __table__ = guest_temp
 
 def calculate_checkout_date(check_in_date, duration):
     if duration == "1 Hour":
@@ -61,114 +53,88 @@ def show_pending_verification():
             # Calculate timeout (5 minutes)
             timeout_duration = timedelta(minutes=5)
             
-            try:
-                with SessionLocal() as session:
-                    progress = 0  # Initial progress value
-                    while not st.session_state.verification_complete:
-                        # Check if timeout has been reached
-                        if datetime.now() - st.session_state.verification_start_time > timeout_duration:
-                            st.error("Verification timeout reached. Please try again or contact security.")
-                            break
-                        
-                        # Query the guest table using plate number
-                        result = session.execute(
-                            text("""
-                                SELECT TOP 1 is_approved
-                                FROM guest
-                                WHERE plate_number = :plate_number
-                                ORDER BY created_at DESC
-                            """),
-                            {"plate_number": st.session_state.get('plate_number', '')}
-                        ).fetchone()
-                        
-                        if result:
-                            is_approved = result[0]
-                            
-                            if is_approved is not None:  # Status has been updated
-                                st.session_state.verification_complete = True
-                                st.session_state.approval_status = is_approved
-                                
-                                # Clear the verification UI
-                                verification_header.empty()
-                                verification_message.empty()
-                                progress_bar.empty()
-                                status_placeholder.empty()
-                                
-                                # Display the final status
-                                if is_approved:
-                                    st.markdown(""" 
-                                        <div style='display: flex; justify-content: center;'>
-                                            <div style='background-color: #e7f3eb; padding: 20px; border-radius: 10px; 
-                                                    border-left: 5px solid #28a745; margin: 20px 0; text-align: center;'>
-                                                <h3 style='color: #28a745; margin: 0 0 10px 0;'>
-                                                    ✅ Registration Approved
-                                                </h3>
-                                                <p style='margin: 0; color: #2c3e50;'>
-                                                    Your vehicle registration has been approved. You may proceed to the entrance.
-                                                </p>
-                                            </div>
-                                        </div>
-                                    """, unsafe_allow_html=True)
-                                    
-                                    # Add instructions  
-                                    st.markdown("<p style='text-align: center; margin-top: 20px;'>"
-                                              "Please show this screen to the security guard at the entrance.</p>", 
-                                              unsafe_allow_html=True)
-                                else:
-                                    st.markdown(""" 
-                                        <div style='display: flex; justify-content: center;'>
-                                            <div style='background-color: #fbebed; padding: 20px; border-radius: 10px; 
-                                                    border-left: 5px solid #dc3545; margin: 20px 0; text-align: center;'>
-                                                <h3 style='color: #dc3545; margin: 0 0 10px 0;'>
-                                                    ❌ Registration Rejected  
-                                                </h3>
-                                                <p style='margin: 0; color: #2c3e50;'>
-                                                    We're sorry, but your registration has been rejected.
-                                                    <br><br>
-                                                    Please contact the security officer for more information.  
-                                                </p>
-                                            </div>
-                                        </div>
-                                    """, unsafe_allow_html=True)
+            verifier = get_guest_verifier()
+            waiter_id = st.session_state.setdefault('verification_waiter_id', str(uuid.uuid4()))
+            verifier.watch(
+                waiter_id,
+                st.session_state.get('plate_number', ''),
+                st.session_state.get('registered_at', st.session_state.verification_start_time),
+            )
 
-                                break
-                        
-                        # Update progress bar incrementally
-                        progress += 3  # Adjust the increment value (e.g., 5%) per loop
-                        if progress > 100:
-                            progress = 100
-                        progress_bar.progress(progress)
+            progress = 0  # Initial progress value
+            while not st.session_state.verification_complete:
+                # Check if timeout has been reached
+                if datetime.now() - st.session_state.verification_start_time > timeout_duration:
+                    verifier.discard(waiter_id)
+                    st.error("Verification timeout reached. Please try again or contact security.")
+                    break
+
+                # Sleeps until a guard decides or the wait slice ends; no connection is held meanwhile
+                is_approved = verifier.wait(waiter_id, timeout=VERIFICATION_WAIT_SECONDS)
+
+                if is_approved is not None:  # Status has been updated
+                    verifier.discard(waiter_id)
+                    st.session_state.verification_complete = True
+                    st.session_state.approval_status = is_approved
+
+                    # Clear the verification UI
+                    verification_header.empty()
+                    verification_message.empty()
+                    progress_bar.empty()
+                    status_placeholder.empty()
+
+                    # Display the final status
+                    if is_approved:
+                        st.markdown(""" 
+                            <div style='display: flex; justify-content: center;'>
+                                <div style='background-color: #e7f3eb; padding: 20px; border-radius: 10px; 
+                                        border-left: 5px solid #28a745; margin: 20px 0; text-align: center;'>
+                                    <h3 style='color: #28a745; margin: 0 0 10px 0;'>
+                                        ✅ Registration Approved
+                                    </h3>
+                                    <p style='margin: 0; color: #2c3e50;'>
+                                        Your vehicle registration has been approved. You may proceed to the entrance.
+                                    </p>
+                                </div>
+                            </div>
+                        """, unsafe_allow_html=True)
                         
-                        # Update the status message to keep the user informed
-                        status_placeholder.markdown("<p style='text-align: center; color: #666;'>""Checking verification status...</p>", unsafe_allow_html=True)
-                        time.sleep(2)  # Delay to simulate processing time
-                    
-            except SQLAlchemyError as e:
-                st.error(f"Database error occurred: {str(e)}")
-                st.session_state.verification_complete = True
-            except Exception as e:  
-                st.error(f"An unexpected error occurred: {str(e)}")
-                st.session_state.verification_complete = True
+                        # Add instructions  
+                        st.markdown("<p style='text-align: center; margin-top: 20px;'>"
+                                  "Please show this screen to the security guard at the entrance.</p>", 
+                                  unsafe_allow_html=True)
+                    else:
+                        st.markdown(""" 
+                            <div style='display: flex; justify-content: center;'>
+                                <div style='background-color: #fbebed; padding: 20px; border-radius: 10px; 
+                                        border-left: 5px solid #dc3545; margin: 20px 0; text-align: center;'>
+                                    <h3 style='color: #dc3545; margin: 0 0 10px 0;'>
+                                        ❌ Registration Rejected  
+                                    </h3>
+                                    <p style='margin: 0; color: #2c3e50;'>
+                                        We're sorry, but your registration has been rejected.
+                                        <br><br>
+                                        Please contact the security officer for more information.  
+                                    </p>
+                                </div>
+                            </div>
+                        """, unsafe_allow_html=True)
+
+                    break
+
+                # Update progress bar incrementally
+                progress += 3  # Adjust the increment value (e.g., 5%) per loop
+                if progress > 100:
+                    progress = 100
+                progress_bar.progress(progress)
+
+                # Update the status message to keep the user informed
+                status_placeholder.markdown("<p style='text-align: center; color: #666;'>""Checking verification status...</p>", unsafe_allow_html=True)
 
 def show_registration_form(form_container):
     with form_container:
         #st.markdown("<img src='https://seeklogo.com/images/U/Universiti_Malaysia_Sabah-logo-590ACB05AA-seeklogo.com.png' width='250' style='display: block; margin: 0 auto;'>", unsafe_allow_html=True)
-        # Get the current file's directory
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        image_path = os.path.join(current_dir, "ums_logo.png")
-        # Read and encode the image
-        with open(image_path, "rb") as img_file:
-            img_bytes = img_file.read()
-            encoded_image = base64.b64encode(img_bytes).decode()
-        # Display centered image using markdown
-        st.markdown(
-            f"""
-            <div style='text-align: center;'>
-                <img src='data:image/png;base64,{encoded_image}' width='250'/>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
+        render_logo()
         
         st.markdown("<h1 style='text-align: center;'>Guest Vehicle Registration Form</h1>", unsafe_allow_html=True)
         st.markdown("<br>", unsafe_allow_html=True)
@@ -225,6 +191,7 @@ def save_guest_registration(name, id_number, phone_number, email, address, plate
         try:
             db.add(new_guest)
             db.commit()
+            get_pending_guest_feed().invalidate()
             return True
         except Exception as e:
             db.rollback()
@@ -236,6 +203,7 @@ def save_guest_registration(name, id_number, phone_number, email, address, plate
         st.error(f"An error occurred: {str(e)}")
         return False
 
+@track_page("Guest Form")
 def render_guest_page():
     # Wake up the DB with a simple query, only if not done already
     if "db_woken_up" not in st.session_state:
@@ -261,6 +229,7 @@ def render_guest_page():
     submitted, name, id_number, phone_number, email, address, plate_number, vehicle_type, visit_purpose, check_in_date, duration = show_registration_form(form_container)
     
     if submitted:
+        st.session_state.registered_at = datetime.now()
         if save_guest_registration(name, id_number, phone_number, email, address, plate_number, vehicle_type, visit_purpose, check_in_date, duration):
             st.session_state.form_submitted = True
             st.session_state.plate_number = plate_number
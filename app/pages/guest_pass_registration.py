@@ -1,12 +1,11 @@
 import streamlit as st
 from datetime import datetime, timedelta
-from app.database import engine
-from sqlalchemy import text
 import re
 import pandas as pd
 import time
-from streamlit_autorefresh import st_autorefresh
 from app.database import insert_guest, fetch_recent_registrations
+from app.utils.metrics import track_page
+from app.utils.refresh import live_fragment, refresh_view
 
 def validate_phone_number(phone):
     pattern = re.compile(r'^\+?[1-9]\d{7,14}$')
@@ -21,6 +20,7 @@ def validate_plate_number(plate):
     return bool(pattern.match(plate))
 
 
+@track_page("Guest Pass Registration")
 def render_page():
         
     st.title("Guest Pass Registration")
@@ -39,16 +39,7 @@ def render_page():
         st.subheader("Registration Form")
 
         # Handle success message with auto-disappear
-        message_placeholder = st.empty()
-        if st.session_state.show_success:
-            message_placeholder.success("Guest registration successful!")
-            # Check if it's time to hide the message (after 3 seconds)
-            if st.session_state.success_time and time.time() - st.session_state.success_time > 3:
-                st.session_state.show_success = False
-                st.session_state.success_time = None
-                message_placeholder.empty()
-        else:
-            message_placeholder.empty()  # Ensure placeholder is cleared
+        render_success_message()
 
         with st.form("guest_registration_form", clear_on_submit=True):
             # Required fields
@@ -113,7 +104,7 @@ def render_page():
                         "visit_purpose": visit_purpose,
                         "check_in_date": check_in_date,
                         "check_out_date": check_out_date,
-                        "is_approved": "1"
+                        "is_approved": True
                     }
 
                     if insert_guest(guest_data):
@@ -126,19 +117,34 @@ def render_page():
     with col2:
 
         st.subheader("Recent Guest Registrations")
-
-        # Fetch and display recent registrations
-        df = fetch_recent_registrations()
-
-        if not df.empty:
-            df['Check-in Date'] = pd.to_datetime(df['Check-in Date']).dt.strftime('%d-%m-%Y')
-            st.dataframe(
-                df,
-                hide_index=True,
-                use_container_width=True
-            )
-        else:
-            st.info("No recent registrations found")
-
-        # Auto refresh for both the table and success message state
-        st_autorefresh(interval=2000, key="page_refresh")
+        render_recent_registrations()
+
+@st.fragment(run_every=1)
+def render_success_message():
+    """Registration success message, hidden by the fragment's own reruns after 3 seconds."""
+    message_placeholder = st.empty()
+    if st.session_state.show_success:
+        message_placeholder.success("Guest registration successful!")
+        # Check if it's time to hide the message (after 3 seconds)
+        if st.session_state.success_time and time.time() - st.session_state.success_time > 3:
+            st.session_state.show_success = False
+            st.session_state.success_time = None
+            message_placeholder.empty()
+    else:
+        message_placeholder.empty()  # Ensure placeholder is cleared
+
+@live_fragment("guest_registrations")
+def render_recent_registrations():
+    """Recent registrations table, rerun on its own as a fragment without rerunning the form."""
+    # Fetch and display recent registrations
+    df = refresh_view("guest_registrations", fetch_recent_registrations)
+
+    if not df.empty:
+        df = df.assign(**{'Check-in Date': pd.to_datetime(df['Check-in Date']).dt.strftime('%d-%m-%Y')})
+        st.dataframe(
+            df,
+            hide_index=True,
+            use_container_width=True
+        )
+    else:
+        st.info("No recent registrations found")
@@ -0,0 +1,126 @@
+import streamlit as st
+import pandas as pd
+from app.database import get_engine, get_pool_metrics, set_sql_echo
+from app.utils.metrics import metrics, track_page
+from app.utils.query_cache import query_cache
+from app.utils.plate_registry import get_plate_registry
+from app.utils.plate_search import get_plate_search_index
+from app.utils.refresh import refresh_stats
+from app.utils.session import is_admin
+
+REFRESH_COLUMNS = {
+    "view": "View",
+    "sessions": "Sessions",
+    "idle_sessions": "Idle Sessions",
+    "min_interval_s": "Min Interval (s)",
+    "median_interval_s": "Median Interval (s)",
+    "refreshes_per_min": "Refreshes / Min",
+}
+
+LATENCY_COLUMNS = {
+    "name": "Name",
+    "calls": "Calls",
+    "errors": "Errors",
+    "rows_per_call": "Rows / Call",
+    "avg_ms": "Avg (ms)",
+    "p50_ms": "p50 (ms)",
+    "p95_ms": "p95 (ms)",
+    "max_ms": "Max (ms)",
+}
+
+def render_latency_table(title, kind):
+    st.subheader(title)
+    table = metrics.table(kind)
+    if table.empty:
+        st.info("No calls recorded yet")
+        return
+    st.dataframe(
+        table.rename(columns=LATENCY_COLUMNS).round(1),
+        hide_index=True,
+        use_container_width=True,
+    )
+
+@track_page("Performance")
+def render_page():
+    st.title("⚡ Performance")
+
+    if not is_admin():
+        st.warning("🔒 This page is only available to administrators.")
+        return
+
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        echo = st.toggle("Log SQL statements", value=bool(get_engine().echo))
+        if echo != bool(get_engine().echo):
+            set_sql_echo(echo)
+    with col2:
+        st.download_button(
+            label="📥 Prometheus Metrics",
+            data=metrics.to_prometheus(),
+            file_name="scvacs_metrics.prom",
+            mime="text/plain",
+            use_container_width=True,
+        )
+    with col3:
+        if st.button("Reset Metrics", use_container_width=True):
+            metrics.reset()
+            st.rerun()
+
+    render_latency_table("Queries", "query")
+    render_latency_table("Page Renders", "page")
+    render_latency_table("SQL Statements", "statement")
+
+    st.subheader("Connection Pool")
+    pool = get_pool_metrics()
+    histogram = pool.pop("wait_ms_histogram")
+    pool_col, wait_col = st.columns(2)
+    pool_col.dataframe(
+        pd.DataFrame({"Metric": list(pool), "Value": [round(value, 2) for value in pool.values()]}),
+        hide_index=True,
+        use_container_width=True,
+    )
+    wait_col.bar_chart(pd.Series(histogram, name="Checkouts"), x_label="Checkout wait (ms)")
+
+    st.subheader("Query Cache")
+    cache_stats = query_cache.stats()
+    st.caption(f"{cache_stats['entries']} cached results")
+    if cache_stats["functions"]:
+        st.dataframe(
+            pd.DataFrame.from_dict(cache_stats["functions"], orient="index").rename_axis("Function").reset_index(),
+            hide_index=True,
+            use_container_width=True,
+        )
+
+    st.subheader("Plate Registry")
+    registry = get_plate_registry()
+    size = registry.size()
+    reg_col1, reg_col2, reg_col3 = st.columns(3)
+    reg_col1.metric("Registered Plates", size["registered"])
+    reg_col2.metric("Guest Plates", size["guests"])
+    reg_col3.metric(
+        "Build Time",
+        f"{registry.build_seconds * 1000:.0f} ms" if registry.build_seconds is not None else "Not built",
+    )
+
+    st.subheader("Plate Search Index")
+    search_index = get_plate_search_index()
+    search_size = search_index.size()
+    search_col1, search_col2, search_col3 = st.columns(3)
+    search_col1.metric("Distinct Plates", search_size["plates"])
+    search_col2.metric("Indexed Substrings", search_size["grams"])
+    search_col3.metric(
+        "Build Time",
+        f"{search_index.build_seconds * 1000:.0f} ms" if search_index.build_seconds is not None else "Not built",
+    )
+
+    st.subheader("Auto Refresh")
+    refresh_table = refresh_stats.table()
+    if refresh_table.empty:
+        st.info("No live views open")
+    else:
+        st.caption("Current refresh interval of every open view; views back off while their data is unchanged")
+        st.dataframe(
+            refresh_table.rename(columns=REFRESH_COLUMNS).round(1),
+            hide_index=True,
+            use_container_width=True,
+        )
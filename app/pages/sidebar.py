@@ -1,9 +1,10 @@
 import streamlit as st
-import time
 from streamlit_option_menu import option_menu
-from app.utils.session import is_logged_in
-from app.database import approve_guest, reject_guest, fetch_pending_guests
-from streamlit_autorefresh import st_autorefresh
+from app.utils.session import is_logged_in, is_admin
+from app.database import approve_guests, reject_guests
+from app.utils.pending_guests import get_pending_guest_feed
+from app.utils.metrics import track_page
+from app.utils.refresh import expire_view, live_fragment, refresh_view
 
 # Navigation options for logged-in users
 LOGGED_IN_MENU = {
@@ -11,34 +12,38 @@ LOGGED_IN_MENU = {
     "Guest Pass Registration": "guest_pass_registration",
     "Vehicle History": "history_page",
     "Analytics": "analytics_page", 
+    "Performance": "performance_page",
     "Logout": None,
 }
 
-def handle_guest_approval(guest, index):
-    """Handle the approval/rejection of a guest."""
-    guest_key = guest['Plate Number']
-    col1, col2 = st.columns(2, gap="small")
+MENU_ICONS = {
+    "View Vehicle Details": "eye",
+    "Guest Pass Registration": "person-plus",
+    "Vehicle History": "clock-history",
+    "Analytics": "graph-up",
+    "Performance": "speedometer2",
+    "Logout": "box-arrow-right",
+}
 
-    # Variable to store the message
-    message_placeholder = st.empty()
+# Pages only shown to admin users
+ADMIN_PAGES = {"Performance"}
 
-    def process_action(action, function, success_message, message_type="success"):
-        try:
-            function(guest['Plate Number'])
-            st.session_state.guest_actions[guest_key] = action
-            
-            # Display message once, spanning both columns
-            with message_placeholder:
-                if message_type == "success":
-                    st.success(success_message)
-                elif message_type == "warning":
-                    st.warning(success_message)
-            
-            time.sleep(5)
-            st.session_state.pending_guests = fetch_pending_guests()
-            st.rerun()
-        except Exception as e:
-            message_placeholder.error(f"Error {action} guest: {e}")
+def decide_guests(guest_ids, approve, label):
+    """Button callback moving the selected guests out of guest_temp and reporting the outcome as a toast."""
+    moved = approve_guests(guest_ids) if approve else reject_guests(guest_ids)
+    expire_view("pending_guests")
+    if moved is None:
+        return
+    if moved:
+        st.toast(f"{label} {'approved' if approve else 'rejected'}.", icon="✅" if approve else "⛔")
+    else:
+        st.toast(f"{label} was already handled.", icon="ℹ️")
+    st.session_state.selected_guests = []
+
+def handle_guest_approval(guest):
+    """Approve/reject buttons for a single pending guest."""
+    col1, col2 = st.columns(2, gap="small")
+    label = f"Guest {guest['Name']} ({guest['Plate Number']})"
 
     # Custom button styling for full width
     button_style = """
@@ -50,66 +55,85 @@ def handle_guest_approval(guest, index):
     </style>
     """
     st.markdown(button_style, unsafe_allow_html=True)
-    
+
     # Buttons in their respective columns
     with col1:
-        if st.button("✓ Approve", key=f"approve_{index}", type="primary"):
-            process_action(
-                'approved', 
-                approve_guest, 
-                f"Guest {guest['Name']} ({guest['Plate Number']}) Approved.", 
-                message_type="success"
-            )
+        st.button(
+            "✓ Approve", key=f"approve_{guest['Guest ID']}", type="primary",
+            on_click=decide_guests, args=([guest['Guest ID']], True, label),
+        )
 
     with col2:
-        if st.button("✗ Reject", key=f"reject_{index}", type="secondary"):
-            process_action(
-                'rejected', 
-                reject_guest, 
-                f"Guest {guest['Name']} ({guest['Plate Number']}) Rejected.", 
-                message_type="warning"
-            )
+        st.button(
+            "✗ Reject", key=f"reject_{guest['Guest ID']}", type="secondary",
+            on_click=decide_guests, args=([guest['Guest ID']], False, label),
+        )
 
+def render_bulk_actions(pending_guests):
+    """Multi-select to approve or reject several pending guests at once."""
+    names = {
+        guest_id: f"{name} ({plate})"
+        for guest_id, name, plate in pending_guests[["Guest ID", "Name", "Plate Number"]].itertuples(index=False)
+    }
+    # Drop selections of guests another guard has handled in the meantime
+    st.session_state.selected_guests = [
+        guest_id for guest_id in st.session_state.get("selected_guests", []) if guest_id in names
+    ]
+    selected = st.multiselect(
+        "Select guests",
+        options=list(names),
+        format_func=names.get,
+        key="selected_guests",
+        placeholder="Choose guests to approve or reject",
+    )
+    label = f"{len(selected)} guest{'s' if len(selected) != 1 else ''}"
+    col1, col2 = st.columns(2, gap="small")
+    with col1:
+        st.button(
+            "✓ Approve Selected", key="approve_selected", type="primary", disabled=not selected,
+            on_click=decide_guests, args=(selected, True, label),
+        )
+    with col2:
+        st.button(
+            "✗ Reject Selected", key="reject_selected", type="secondary", disabled=not selected,
+            on_click=decide_guests, args=(selected, False, label),
+        )
+
+@live_fragment("pending_guests")
 def render_pending_guests_section(latest_pending_guests=None):
-    """Render the pending guest approvals section."""
+    """
+    Render the pending guest approvals section. It reruns on its own as a fragment,
+    so checking for new guests never reruns the open page.
+    """
     st.markdown("### Pending Guest Approvals")
 
-    # Fetch latest pending guests if not provided
+    # Read the shared feed if not provided; it only queries guest_temp when it changed
     if latest_pending_guests is None:
         try:
-            latest_pending_guests = fetch_pending_guests()
+            latest_pending_guests = refresh_view("pending_guests", get_pending_guest_feed().get)
         except Exception as e:
             st.error(f"Error fetching pending guests: {e}")
             return
 
-    # Initialize guest actions if not exists
-    st.session_state.setdefault('guest_actions', {})
-
     if latest_pending_guests is not None and not latest_pending_guests.empty:
-        # Filter pending guests who haven't been acted upon
-        pending_guests = latest_pending_guests[
-            ~latest_pending_guests['Plate Number'].isin(st.session_state.guest_actions.keys())
-        ]
-
-        if not pending_guests.empty:
-            st.write(f"Total pending guests: {len(pending_guests)}")
-            for index, guest in pending_guests.iterrows():
-                with st.expander(f"📋 {guest['Name']} ({guest['Plate Number']})"):
-                    st.markdown(f"""
-                        **Vehicle Type:** {guest['Vehicle Type']}  
-                        **Phone:** {guest['Phone Number']}  
-                        **Purpose:** {guest['Visit Purpose']}  
-                        **Check-in:** {guest['Check-in Date']}  
-                        **Check-out:** {guest['Check-out Date']}
-                    """)
-                    handle_guest_approval(guest, index)
-        else:
-            st.info("👍 No pending approvals")
+        pending_guests = latest_pending_guests
+        st.write(f"Total pending guests: {len(pending_guests)}")
+        if len(pending_guests) > 1:
+            render_bulk_actions(pending_guests)
+        for _, guest in pending_guests.iterrows():
+            with st.expander(f"📋 {guest['Name']} ({guest['Plate Number']})"):
+                st.markdown(f"""
+                    **Vehicle Type:** {guest['Vehicle Type']}  
+                    **Phone:** {guest['Phone Number']}  
+                    **Purpose:** {guest['Visit Purpose']}  
+                    **Check-in:** {guest['Check-in Date']}  
+                    **Check-out:** {guest['Check-out Date']}
+                """)
+                handle_guest_approval(guest)
     else:
         st.info("👍 No pending approvals")
 
-    st_autorefresh(interval=2000, key="pending_refresh")
-    
+@track_page("Sidebar")
 def render_sidebar(latest_pending_guests=None):
     """Render the main sidebar with navigation and pending approvals."""
     with st.sidebar:
@@ -124,10 +148,11 @@ def render_sidebar(latest_pending_guests=None):
             return selected
 
         # Main navigation menu
+        menu = [page for page in LOGGED_IN_MENU if is_admin() or page not in ADMIN_PAGES]
         selected = option_menu(
             "Main Menu",
-            list(LOGGED_IN_MENU.keys()),
-            icons=["eye", "person-plus", "clock-history", "graph-up", "box-arrow-right"],
+            menu,
+            icons=[MENU_ICONS[page] for page in menu],
             menu_icon="list",
             default_index=0,
         )
@@ -1,15 +1,23 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-from app.database import fetch_vehicle_history
-from streamlit_autorefresh import st_autorefresh
+from app.database import fetch_vehicle_history_page
+from app.utils.history_cache import get_history_cache
+from app.utils.export import EXPORT_FORMATS, start_export, get_export_job, discard_export_job
+from app.settings import EXPORT_DOWNLOAD_MAX_MB
+from app.utils.metrics import track_page
+from app.utils.refresh import SESSION_KEY, frame_version, live_fragment, refresh_view
 
+PAGE_SIZE = 50
+
+@track_page("Vehicle History")
 def render_page():
     st.title("Vehicle History")
 
-    # Preserve login state while clearing other session state variables
+    # Preserve login (including the user, which decides admin access), pagination and refresh state
+    # while clearing other session state variables
     login_state = st.session_state.get("logged_in", False)
-    session_vars_to_keep = ["logged_in"]
+    session_vars_to_keep = ["logged_in", "username", "history_filters", "history_cursors", "history_export_job",
+                            "history_export_format", SESSION_KEY]
     
     # Clear all stored values in session state except login state
     for key in list(st.session_state.keys()):
@@ -18,9 +26,6 @@ def render_page():
     
     # Restore login state
     st.session_state["logged_in"] = login_state
-    
-    # Auto refresh every 1 second (1000 milliseconds)
-    st_autorefresh(interval=1000, key="vehicle_history_refresh")
 
     # Create three columns for filtering options
     col1, col2, col3 = st.columns(3)
@@ -39,39 +44,116 @@ def render_page():
             help="Show results until this date. Leave empty to show up to latest data.",
         )
 
-    # Fetch the data from the database
-    data = fetch_vehicle_history()
+    # Restart from the first page whenever the filters change
+    filters = (plate_number_filter, start_date, end_date)
+    if st.session_state.get("history_filters") != filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_cursors = [None]
+
+    render_history_table(filters, st.session_state.history_cursors)
+
+    render_export_section(plate_number_filter.strip() or None, start_date, end_date)
+
+def load_history_page(filters, cursor):
+    """One page of history for the filters, starting after `cursor`."""
+    plate_number_filter, start_date, end_date = filters
+    page = None
+    if not any(filters) and cursor is None:
+        # The unfiltered first page is served from the shared tail cache
+        try:
+            history_cache = get_history_cache()
+            history_cache.refresh()
+            page = history_cache.latest_page(PAGE_SIZE)
+        except Exception as e:
+            return (f"Error fetching vehicle history: {e}", None)
+    if page is not None:
+        return page
+    # The cache can't answer every page, e.g. when eviction left too few rows for a full one
+    return fetch_vehicle_history_page(
+        plate_filter=plate_number_filter.strip() or None,
+        start_date=start_date,
+        end_date=end_date,
+        cursor=cursor,
+        page_size=PAGE_SIZE,
+    )
+
+@live_fragment("vehicle_history")
+def render_history_table(filters, cursors):
+    """The visible page of history, rerun on its own as a fragment without rerunning the filters or export."""
+    # Fetch only the visible page from the database
+    data, next_cursor = refresh_view(
+        "vehicle_history",
+        lambda: load_history_page(filters, cursors[-1]),
+        version=lambda page: frame_version(page[0]),
+        key=(filters, cursors[-1]),
+    )
 
     # Check if data is a DataFrame before checking if it's empty
     if isinstance(data, pd.DataFrame):
         if not data.empty:
-            # Ensure the 'Timestamp' column exists
-            if 'Timestamp' in data.columns:
-                # Apply filtering based on the plate number
-                if plate_number_filter:
-                    data = data[data['Plate Number'].str.contains(plate_number_filter, case=False, na=False)]
-                
-                # Convert 'Timestamp' to datetime and handle invalid entries
-                data['Timestamp'] = pd.to_datetime(data['Timestamp'], errors='coerce')
-                
-                # Drop rows with invalid dates
-                data = data.dropna(subset=['Timestamp'])
-                
-                # Apply start date filter if provided
-                if start_date:
-                    data = data[data['Timestamp'] >= pd.to_datetime(start_date)]
-                
-                # Apply end date filter if provided
-                if end_date:
-                    # Adjust end_date to include the entire day
-                    adjusted_end_date = end_date + timedelta(days=1)
-                    data = data[data['Timestamp'] < pd.to_datetime(adjusted_end_date)]
-                
-                # Display the filtered data
-                st.dataframe(data, use_container_width=True)
-            else:
-                st.error("'Timestamp' column is missing from the data.")
+            st.dataframe(data, use_container_width=True)
         else:
             st.warning("No data available.")
+
+        # Pagination controls
+        prev_col, page_col, next_col = st.columns([1, 2, 1])
+        with prev_col:
+            if st.button("◀ Previous", disabled=len(cursors) == 1, use_container_width=True):
+                cursors.pop()
+                st.rerun()
+        with page_col:
+            st.markdown(f"<p style='text-align: center;'>Page {len(cursors)}</p>", unsafe_allow_html=True)
+        with next_col:
+            if st.button("Next ▶", disabled=next_cursor is None, use_container_width=True):
+                cursors.append(next_cursor)
+                st.rerun()
     else:
-        st.error(data)  # Handle the case where data is not a DataFrame
\ No newline at end of file
+        st.error(data)  # Handle the case where data is not a DataFrame
+
+def render_export_section(plate_filter, start_date, end_date):
+    """Export the filtered history to a file in the background, for audits over long ranges."""
+    with st.expander("📤 Export Filtered History"):
+        job = get_export_job(st.session_state.get("history_export_job"))
+
+        if job is None:
+            export_format = st.selectbox("Format", list(EXPORT_FORMATS), key="history_export_format")
+            if st.button("Start Export"):
+                job = start_export(EXPORT_FORMATS[export_format], plate_filter, start_date, end_date)
+                st.session_state.history_export_job = job.job_id
+                st.rerun()
+            return
+
+        if not job.done:
+            render_export_progress(job.job_id)
+            return
+
+        if job.error is not None:
+            st.error(f"Export failed: {job.error}")
+        else:
+            st.success(f"Exported {job.rows:,} rows ({job.rows_per_second:,.0f} rows/s)")
+            size_mb = job.size() / 1024 ** 2
+            if size_mb > EXPORT_DOWNLOAD_MAX_MB:
+                # Streamlit would hold the whole file in server memory to serve it
+                st.info(
+                    f"The export is {size_mb:,.0f} MB, too large to download here. It was written to "
+                    f"`{job.path}` on the server; `python -m app.utils.export` exports to a file directly."
+                )
+            else:
+                # The file is only read once the button is clicked, not on every rerun
+                st.download_button(
+                    label=f"📥 Download Export ({size_mb:,.1f} MB)",
+                    data=job.read,
+                    file_name=f"scvacs_vehicle_history.{job.fmt}",
+                    on_click="ignore",
+                )
+        if st.button("New Export"):
+            discard_export_job(st.session_state.pop("history_export_job", None))
+            st.rerun()
+
+@st.fragment(run_every=1)
+def render_export_progress(job_id):
+    """Export progress, updated every second; reruns the page once the export finished."""
+    job = get_export_job(job_id)
+    if job is None or job.done:
+        st.rerun()
+    st.info(f"⏳ Exporting... {job.rows:,} rows so far ({job.rows_per_second:,.0f} rows/s)")
@@ -1,9 +1,9 @@
 import streamlit as st
-from app.database import SessionLocal, engine
-from sqlalchemy import text
+import uuid
 import pandas as pd
-from streamlit_autorefresh import st_autorefresh
-from app.database import check_for_updates
+from app.utils.detection_poller import get_detection_poller
+from app.utils.metrics import track_page
+from app.utils.refresh import live_fragment, refresh_view
 
 def display_vehicle_details(vehicle_df, status):
     if status == 1:  # Registered vehicle
@@ -64,18 +64,30 @@ def display_vehicle_details(vehicle_df, status):
             st.metric("Registration Status", vehicle_df['registration_status'].values[0])
             st.metric("Detection Time", vehicle_df['detection_time'].values[0])
 
-def render_page():
-    st.markdown("<h1 style='text-align: center;'>Smart Campus Vehicle Access Control System</h1>", unsafe_allow_html=True)
-    # Initialize state
-    if "vehicle_details" not in st.session_state:
-        st.session_state.vehicle_details = pd.DataFrame()
-    if "status" not in st.session_state:
-        st.session_state.status = None
-
-    st_autorefresh(interval=2000, key="vehicle_history_refresh")
+def display_plate_match(vehicle_df):
+    """Note a read that was matched approximately, or the nearest known plates of a low-confidence read."""
+    read_plate = vehicle_df['read_plate'].values[0] if 'read_plate' in vehicle_df else None
+    candidates = vehicle_df['plate_candidates'].values[0] if 'plate_candidates' in vehicle_df else []
+    if read_plate:
+        st.info(f"🔎 Read as {read_plate}, matched to {vehicle_df['plate_number'].values[0]} "
+                f"(distance {vehicle_df['match_distance'].values[0]:.1f})")
+    elif candidates:
+        nearest = ", ".join(f"{plate} ({distance:.1f})" for plate, distance in candidates)
+        st.warning(f"🔎 Possible plates: {nearest}")
 
+@live_fragment("vehicle_details")
+def render_detection_card():
+    """Latest detection card, rerun on its own as a fragment without rerunning the page."""
     try:
-        status, vehicle_df = check_for_updates()
+        # Detections are polled once per process and read here from memory
+        poller = get_detection_poller()
+        status, vehicle_df = refresh_view(
+            "vehicle_details",
+            lambda: poller.get_update(st.session_state.detection_subscriber_id),
+            version=lambda update: poller.latest_event.version if poller.latest_event is not None else None,
+        )
+        if poller.last_error is not None:
+            st.error(f"An error occurred: {str(poller.last_error)}")
 
         if vehicle_df is not None and not vehicle_df.empty:
             st.session_state.vehicle_details = vehicle_df
@@ -83,6 +95,7 @@ def render_page():
 
         if not st.session_state.vehicle_details.empty:
             display_vehicle_details(st.session_state.vehicle_details, st.session_state.status)
+            display_plate_match(st.session_state.vehicle_details)
         else:
             st.markdown(
             "<div style='background-color: #89CFF0; padding: 5px; border-radius: 5px;'>"
@@ -92,5 +105,18 @@ def render_page():
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
 
+@track_page("View Vehicle Details")
+def render_page():
+    st.markdown("<h1 style='text-align: center;'>Smart Campus Vehicle Access Control System</h1>", unsafe_allow_html=True)
+    # Initialize state
+    if "vehicle_details" not in st.session_state:
+        st.session_state.vehicle_details = pd.DataFrame()
+    if "status" not in st.session_state:
+        st.session_state.status = None
+    if "detection_subscriber_id" not in st.session_state:
+        st.session_state.detection_subscriber_id = str(uuid.uuid4())
+
+    render_detection_card()
+
 if __name__ == "__main__":
     render_page()
@@ -0,0 +1,91 @@
+"""
+Table definitions of the SCVACS database as SQLAlchemy Core tables.
+
+Queries are built from these instead of raw T-SQL, so the same code runs on SQL Server
+and SQLite. The few expressions SQLAlchemy doesn't translate on its own are
+defined here with a compiler per dialect.
+"""
+import uuid
+from datetime import datetime
+from sqlalchemy import (
+    Boolean, Column, Date, DateTime, Float, Integer, MetaData, String, Table, Uuid, cast
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+metadata = MetaData()
+
+users = Table(
+    "users", metadata,
+    Column("username", String(50), primary_key=True),
+    Column("fullname", String(255)),
+    Column("address", String(255)),
+    Column("phone_number", String(15)),
+)
+
+registered_vehicle = Table(
+    "registered_vehicle", metadata,
+    Column("number_plate", String(50), primary_key=True),
+    Column("username", String(50)),
+    Column("pass_expiry_date", DateTime),
+    Column("make", String(50)),
+    Column("model", String(50)),
+    Column("color", String(30)),
+    Column("vehicle_type", String(30)),
+)
+
+guest = Table(
+    "guest", metadata,
+    Column("guest_id", Integer, primary_key=True, autoincrement=True),
+    Column("name", String(255), nullable=False),
+    Column("plate_number", String(50), nullable=False, index=True),
+    Column("id_number", String(50)),
+    Column("phone_number", String(15)),
+    Column("email", String(100)),
+    Column("address", String(100)),
+    Column("visit_purpose", String(255)),
+    Column("check_in_date", DateTime),
+    Column("check_out_date", DateTime),
+    Column("is_approved", Boolean),
+    Column("created_at", DateTime, index=True, default=datetime.now),
+)
+
+# Guest registrations waiting for a guard; ids are generated client side so no NEWID() is needed
+guest_temp = Table(
+    "guest_temp", metadata,
+    Column("guest_id", Uuid, primary_key=True, default=uuid.uuid4),
+    Column("name", String(255), nullable=False),
+    Column("plate_number", String(50), nullable=False),
+    Column("vehicle_type", String(30)),
+    Column("id_number", String(50), nullable=False),
+    Column("phone_number", String(15)),
+    Column("email", String(100)),
+    Column("address", String(100)),
+    Column("visit_purpose", String(255)),
+    Column("check_in_date", DateTime),
+    Column("check_out_date", DateTime),
+)
+
+vehicle_history = Table(
+    "vehicle_history", metadata,
+    Column("vehicle_history_id", Integer, primary_key=True, autoincrement=True),
+    Column("plate_number", String(50), nullable=False, index=True),
+    Column("confidence", Float),
+    Column("timestamp", DateTime, nullable=False, index=True),
+    Column("registration_status", Integer, nullable=False),
+)
+
+
+class calendar_date(FunctionElement):
+    """Date part of a datetime column, e.g. for grouping detections per day."""
+    type = Date()
+    inherit_cache = True
+
+@compiles(calendar_date)
+def _calendar_date_default(element, compiler, **kw):
+    return compiler.process(cast(list(element.clauses)[0], Date), **kw)
+
+@compiles(calendar_date, "sqlite")
+def _calendar_date_sqlite(element, compiler, **kw):
+    # SQLite has no DATE type; CAST(... AS DATE) would return the year as a number
+    return f"DATE({compiler.process(element.clauses, **kw)})"
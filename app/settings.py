@@ -0,0 +1,77 @@
+"""
+Application settings, read once from the environment and an optional .env file.
+Every value can be overridden with the SCVACS_* variable next to it, e.g.
+SCVACS_DATABASE_URL=sqlite:///scvacs.sqlite3 to run against a local stand-in.
+"""
+import os
+import tempfile
+import urllib.parse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+def _flag(name, default):
+    return os.environ.get(name, default).lower() in ("1", "true", "yes")
+
+# Database connection; SCVACS_DATABASE_URL takes precedence over the individual SQL Server
+# parts. There are no default credentials: without either, DATABASE_URL is None and the
+# first query fails with a message saying what to set.
+DB_HOST = os.environ.get("SCVACS_DB_HOST", "")
+DB_PORT = os.environ.get("SCVACS_DB_PORT", "1433")
+DB_NAME = os.environ.get("SCVACS_DB_NAME", "scvacs")
+DB_USER = os.environ.get("SCVACS_DB_USER", "")
+DB_PASSWORD = os.environ.get("SCVACS_DB_PASSWORD", "")
+
+def _database_url():
+    if os.environ.get("SCVACS_DATABASE_URL"):
+        return os.environ["SCVACS_DATABASE_URL"]
+    if DB_HOST and DB_USER and DB_PASSWORD:
+        return f"mssql+pytds://{DB_USER}:{urllib.parse.quote_plus(DB_PASSWORD)}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    return None
+
+DATABASE_URL = _database_url()
+
+# Seconds to wait for a new connection and for a query before giving up
+CONNECT_TIMEOUT = float(os.environ.get("SCVACS_CONNECT_TIMEOUT", "15"))
+QUERY_TIMEOUT = float(os.environ.get("SCVACS_QUERY_TIMEOUT", "60"))
+
+# Connection pool, tuned to the number of gate screens
+POOL_SIZE = int(os.environ.get("SCVACS_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.environ.get("SCVACS_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.environ.get("SCVACS_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.environ.get("SCVACS_POOL_RECYCLE", "1800"))
+POOL_PRE_PING = _flag("SCVACS_POOL_PRE_PING", "true")
+# Logging every statement is expensive with autorefresh, so it is off unless asked for
+SQL_ECHO = _flag("SCVACS_SQL_ECHO", "false")
+
+# Size of the in-process tail of vehicle_history, by row count and by age
+TAIL_CACHE_MAX_ROWS = int(os.environ.get("SCVACS_TAIL_CACHE_MAX_ROWS", "5000"))
+TAIL_CACHE_MAX_AGE_HOURS = float(os.environ.get("SCVACS_TAIL_CACHE_MAX_AGE_HOURS", "24"))
+
+# Local SQLite file holding the hourly rollups; empty uses one file per database URL
+ROLLUP_DB_PATH = os.environ.get("SCVACS_ROLLUP_DB", "")
+
+# File the Prometheus metrics are written to; empty disables the exporter
+METRICS_FILE = os.environ.get("SCVACS_METRICS_FILE", "")
+
+# Worker threads (and so at most this many pooled connections) for queries run in parallel,
+# and seconds a page waits for each of them before showing a placeholder
+CONCURRENT_QUERY_WORKERS = int(os.environ.get("SCVACS_CONCURRENT_QUERY_WORKERS", "8"))
+CONCURRENT_QUERY_TIMEOUT = float(os.environ.get("SCVACS_CONCURRENT_QUERY_TIMEOUT", "10"))
+
+# Detection ingestion: events queued before producers are pushed back, most rows per write,
+# seconds between writes and the address of the HTTP listener
+INGEST_QUEUE_SIZE = int(os.environ.get("SCVACS_INGEST_QUEUE_SIZE", "10000"))
+INGEST_BATCH_SIZE = int(os.environ.get("SCVACS_INGEST_BATCH_SIZE", "2000"))
+INGEST_FLUSH_SECONDS = float(os.environ.get("SCVACS_INGEST_FLUSH_SECONDS", "0.25"))
+INGEST_HOST = os.environ.get("SCVACS_INGEST_HOST", "127.0.0.1")
+INGEST_PORT = int(os.environ.get("SCVACS_INGEST_PORT", "8502"))
+# JSON-lines file detections that can't be written are appended to; empty only logs them
+INGEST_REJECTS_FILE = os.environ.get("SCVACS_INGEST_REJECTS_FILE", "scvacs_ingest_rejects.jsonl")
+
+# Where background exports are written before download
+EXPORT_DIR = os.environ.get("SCVACS_EXPORT_DIR", tempfile.gettempdir())
+# Larger exports are not offered through the browser, which would load them into server memory
+EXPORT_DOWNLOAD_MAX_MB = float(os.environ.get("SCVACS_EXPORT_DOWNLOAD_MAX_MB", "200"))
+# Finished exports and their files are deleted after this long, downloaded or not
+EXPORT_MAX_AGE_HOURS = float(os.environ.get("SCVACS_EXPORT_MAX_AGE_HOURS", "24"))
@@ -0,0 +1,36 @@
+import base64
+import mimetypes
+from functools import lru_cache
+from pathlib import Path
+import streamlit as st
+
+# Served by Streamlit at app/static/<name> when server.enableStaticServing is on
+STATIC_DIR = Path(__file__).resolve().parents[2] / "static"
+STATIC_URL = "app/static"
+
+@lru_cache(maxsize=None)
+def _data_uri(name):
+    """The asset inlined as a data URI, read and encoded once per process."""
+    data = (STATIC_DIR / name).read_bytes()
+    mime = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
+
+def asset_url(name):
+    """
+    URL of a file in the static directory. The browser fetches and caches it once, so
+    pages only send the reference; without static serving it falls back to a cached data URI.
+    """
+    if st.get_option("server.enableStaticServing"):
+        return f"{STATIC_URL}/{name}"
+    return _data_uri(name)
+
+def render_logo(width=250):
+    """Centered UMS logo used at the top of the public pages."""
+    st.markdown(
+        f"""
+        <div style='text-align: center;'>
+            <img src='{asset_url("ums_logo.png")}' width='{width}'/>
+        </div>
+        """,
+        unsafe_allow_html=True
+    )
@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from app.settings import CONCURRENT_QUERY_TIMEOUT, CONCURRENT_QUERY_WORKERS
+
+
+@dataclass
+class QueryOutcome:
+    """Result of one query in a batch: its value, the exception it raised, or a timeout."""
+    value: object = None
+    error: Exception = None
+    timed_out: bool = False
+
+    @property
+    def ok(self):
+        return self.error is None and not self.timed_out
+
+
+class QueryBatch:
+    """Queries submitted together; each result is awaited up to its own deadline."""
+
+    def __init__(self, futures, deadlines):
+        self._futures = futures
+        self._deadlines = deadlines
+        self._outcomes = {}
+
+    def outcome(self, name):
+        """Wait for `name` until its deadline and return its QueryOutcome."""
+        if name not in self._outcomes:
+            remaining = max(0.0, self._deadlines[name] - time.monotonic())
+            try:
+                self._outcomes[name] = QueryOutcome(value=self._futures[name].result(timeout=remaining))
+            except FutureTimeoutError:
+                # The query keeps running and fills the query cache for the next render
+                self._outcomes[name] = QueryOutcome(timed_out=True)
+            except Exception as e:
+                self._outcomes[name] = QueryOutcome(error=e)
+        return self._outcomes[name]
+
+    def results(self):
+        """Outcomes of every query in the batch."""
+        return {name: self.outcome(name) for name in self._futures}
+
+
+class ConcurrentQueryExecutor:
+    """
+    Thread pool that runs independent queries in parallel, each on its own pooled
+    connection, so a page waits for its slowest query instead of the sum of all of them.
+    The pool is shared by every session, which caps the connections it can take.
+    """
+
+    def __init__(self, max_workers=CONCURRENT_QUERY_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query")
+
+    def submit(self, tasks, timeout=CONCURRENT_QUERY_TIMEOUT, timeouts=None):
+        """
+        Start every zero-argument callable in `tasks` ({name: callable}) and return a QueryBatch.
+        `timeouts` overrides the default timeout in seconds for individual queries.
+        """
+        timeouts = timeouts or {}
+        started = time.monotonic()
+        futures = {name: self._executor.submit(func) for name, func in tasks.items()}
+        deadlines = {name: started + timeouts.get(name, timeout) for name in tasks}
+        return QueryBatch(futures, deadlines)
+
+    def run(self, tasks, timeout=CONCURRENT_QUERY_TIMEOUT, timeouts=None):
+        """Run `tasks` concurrently and return {name: QueryOutcome} once all finished or timed out."""
+        return self.submit(tasks, timeout, timeouts).results()
+
+
+_query_executor = None
+_query_executor_lock = threading.Lock()
+
+def get_query_executor():
+    """Process-wide concurrent query executor."""
+    global _query_executor
+    with _query_executor_lock:
+        if _query_executor is None:
+            _query_executor = ConcurrentQueryExecutor()
+        return _query_executor
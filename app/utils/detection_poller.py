@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+import pandas as pd
+from app.database import fetch_latest_detection_marker, fetch_latest_vehicle_detail
+
+logger = logging.getLogger(__name__)
+
+# How often the poller checks vehicle_history for a new detection
+POLL_INTERVAL_SECONDS = 1.0
+# Subscribers that haven't read an update for this long are dropped
+SUBSCRIBER_TIMEOUT_SECONDS = 60.0
+
+
+@dataclass
+class DetectionEvent:
+    """A resolved detection published to every subscriber."""
+    version: int
+    marker: tuple
+    status: int
+    vehicle_df: pd.DataFrame
+    published_at: datetime
+
+
+class DetectionPoller:
+    """
+    One background thread per process that watches vehicle_history.
+    Each new detection is resolved once and published in memory, so the number of
+    open gate screens doesn't change the database load. The thread only polls while
+    at least one session is subscribed.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL_SECONDS):
+        self.interval = interval
+        self.latest_event = None
+        self.last_error = None
+        self._version = 0
+        self._marker = None
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def subscribe(self, subscriber_id):
+        """Register a session and make sure the polling thread is running."""
+        with self._lock:
+            self._subscribers.setdefault(subscriber_id, {"seen_version": 0, "last_seen": time.monotonic()})
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="detection-poller", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def unsubscribe(self, subscriber_id):
+        with self._lock:
+            self._subscribers.pop(subscriber_id, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def get_update(self, subscriber_id):
+        """
+        Return (status, vehicle_df) for the latest event this subscriber hasn't seen,
+        or (None, None) if nothing new was published since its last read.
+        """
+        self.subscribe(subscriber_id)
+        with self._lock:
+            subscriber = self._subscribers[subscriber_id]
+            subscriber["last_seen"] = time.monotonic()
+            event = self.latest_event
+            if event is None or event.version == subscriber["seen_version"]:
+                return None, None
+            subscriber["seen_version"] = event.version
+            return event.status, event.vehicle_df
+
+    def _prune_subscribers(self):
+        cutoff = time.monotonic() - SUBSCRIBER_TIMEOUT_SECONDS
+        with self._lock:
+            for subscriber_id, subscriber in list(self._subscribers.items()):
+                if subscriber["last_seen"] < cutoff:
+                    del self._subscribers[subscriber_id]
+            return len(self._subscribers)
+
+    def poll_once(self):
+        """Check for a new detection and publish it. Returns True if an event was published."""
+        # The marker is a cheap probe; the published marker is read with the detail, so a
+        # detection written between the two queries isn't labelled with the older marker
+        # and published again on the next poll
+        marker = fetch_latest_detection_marker()
+        if marker is None or marker == self._marker:
+            return False
+
+        marker, status, vehicle_df = fetch_latest_vehicle_detail()
+        if marker is None or marker == self._marker:
+            return False
+        self._marker = marker
+        if vehicle_df is None or vehicle_df.empty:
+            return False
+
+        with self._lock:
+            self._version += 1
+            self.latest_event = DetectionEvent(self._version, marker, status, vehicle_df, datetime.now())
+        return True
+
+    def _run(self):
+        while True:
+            if self._prune_subscribers() == 0:
+                # Idle until a session subscribes again
+                self._wakeup.clear()
+                self._wakeup.wait()
+                continue
+            try:
+                self.poll_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                logger.warning("Detection poll failed: %s", e)
+            time.sleep(self.interval)
+
+
+_detection_poller = None
+_detection_poller_lock = threading.Lock()
+
+def get_detection_poller():
+    """Process-wide detection poller shared by every session."""
+    global _detection_poller
+    with _detection_poller_lock:
+        if _detection_poller is None:
+            _detection_poller = DetectionPoller()
+        return _detection_poller
@@ -0,0 +1,230 @@
+import argparse
+import csv
+import os
+import threading
+import time
+import uuid
+from datetime import date
+from app.database import stream_vehicle_history
+from app.settings import EXPORT_DIR, EXPORT_MAX_AGE_HOURS
+
+EXPORT_FORMATS = {"CSV": "csv", "Parquet": "parquet", "Excel": "xlsx"}
+EXPORT_COLUMNS = ["Plate Number", "Confidence", "Timestamp", "Registration Status"]
+EXPORT_CHUNK_SIZE = 10000
+EXPORT_FILE_PREFIX = "scvacs_vehicle_history_"
+# Excel sheets hold at most 1,048,576 rows including the header
+XLSX_MAX_ROWS_PER_SHEET = 1048575
+
+STATUS_LABELS = {1: "Registered", 0: "Unregistered"}
+
+
+class CsvExportWriter:
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(EXPORT_COLUMNS)
+
+    def write(self, rows):
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetExportWriter:
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self._pa = pa
+        self._schema = pa.schema([
+            ("Plate Number", pa.string()),
+            ("Confidence", pa.float64()),
+            ("Timestamp", pa.timestamp("us")),
+            ("Registration Status", pa.string()),
+        ])
+        self._writer = pq.ParquetWriter(path, self._schema)
+
+    def write(self, rows):
+        columns = list(zip(*rows))
+        self._writer.write_table(self._pa.Table.from_arrays(
+            [self._pa.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema,
+        ))
+
+    def close(self):
+        self._writer.close()
+
+
+class XlsxExportWriter:
+    def __init__(self, path):
+        import xlsxwriter
+        # constant_memory flushes each row to disk as soon as the next one starts
+        self._workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+        self._date_format = self._workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+        self._sheet = None
+        self._sheet_count = 0
+        self._row = 0
+
+    def _new_sheet(self):
+        self._sheet_count += 1
+        self._sheet = self._workbook.add_worksheet(f"Vehicle History {self._sheet_count}")
+        self._sheet.write_row(0, 0, EXPORT_COLUMNS)
+        self._sheet.set_column(0, 0, 16)
+        self._sheet.set_column(2, 2, 20)
+        self._sheet.set_column(3, 3, 20)
+        self._row = 1
+
+    def write(self, rows):
+        for plate_number, confidence, timestamp, status in rows:
+            if self._sheet is None or self._row > XLSX_MAX_ROWS_PER_SHEET:
+                self._new_sheet()
+            self._sheet.write_string(self._row, 0, str(plate_number))
+            self._sheet.write(self._row, 1, confidence)
+            self._sheet.write_datetime(self._row, 2, timestamp, self._date_format)
+            self._sheet.write_string(self._row, 3, status)
+            self._row += 1
+
+    def close(self):
+        if self._sheet is None:
+            self._new_sheet()
+        self._workbook.close()
+
+
+EXPORT_WRITERS = {"csv": CsvExportWriter, "parquet": ParquetExportWriter, "xlsx": XlsxExportWriter}
+
+def export_vehicle_history(path, fmt="csv", plate_filter=None, start_date=None, end_date=None,
+                           chunk_size=EXPORT_CHUNK_SIZE, progress=None):
+    """
+    Stream filtered vehicle history from the database into a CSV, Parquet or XLSX file.
+    Rows are written chunk by chunk, so memory stays flat for any date range.
+    `progress(rows_written, rows_per_second)` is called after every chunk.
+    Returns a dict with the row count, elapsed seconds and rows per second.
+    """
+    writer = EXPORT_WRITERS[fmt](path)
+    started = time.perf_counter()
+    rows_written = 0
+    try:
+        for chunk in stream_vehicle_history(plate_filter, start_date, end_date, chunk_size):
+            writer.write([
+                (
+                    row.plate_number,
+                    float(row.confidence) if row.confidence is not None else None,
+                    row.timestamp,
+                    STATUS_LABELS.get(int(row.registration_status), ""),
+                )
+                for row in chunk
+            ])
+            rows_written += len(chunk)
+            if progress:
+                elapsed = time.perf_counter() - started
+                progress(rows_written, rows_written / elapsed if elapsed else 0.0)
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    return {"rows": rows_written, "seconds": elapsed, "rows_per_second": rows_written / elapsed if elapsed else 0.0}
+
+
+class ExportJob:
+    """A background export whose progress the history page polls between reruns."""
+
+    def __init__(self, fmt, plate_filter, start_date, end_date):
+        self.job_id = uuid.uuid4().hex
+        self.fmt = fmt
+        self.path = os.path.join(EXPORT_DIR, f"{EXPORT_FILE_PREFIX}{self.job_id}.{fmt}")
+        self.rows = 0
+        self.rows_per_second = 0.0
+        self.done = False
+        self.finished_at = None
+        self.error = None
+        self._args = (plate_filter, start_date, end_date)
+
+    def _progress(self, rows, rows_per_second):
+        self.rows, self.rows_per_second = rows, rows_per_second
+
+    def run(self):
+        try:
+            stats = export_vehicle_history(self.path, self.fmt, *self._args, progress=self._progress)
+            self._progress(stats["rows"], stats["rows_per_second"])
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished_at = time.time()
+            self.done = True
+
+    def size(self):
+        """Size of the finished file in bytes."""
+        return os.path.getsize(self.path)
+
+    def read(self):
+        """Contents of the finished file, read only when a download is requested."""
+        with open(self.path, "rb") as export_file:
+            return export_file.read()
+
+
+_export_jobs = {}
+_export_jobs_lock = threading.Lock()
+
+def discard_stale_exports(max_age_hours=EXPORT_MAX_AGE_HOURS):
+    """
+    Forget finished jobs older than `max_age_hours` and delete their files, along with
+    export files of earlier processes, so abandoned exports don't pile up.
+    """
+    cutoff = time.time() - max_age_hours * 3600
+    with _export_jobs_lock:
+        stale = [job_id for job_id, job in _export_jobs.items() if job.done and job.finished_at < cutoff]
+        active = {job.path for job in _export_jobs.values()}
+    for job_id in stale:
+        discard_export_job(job_id)
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        if name.startswith(EXPORT_FILE_PREFIX) and path not in active:
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+def start_export(fmt, plate_filter=None, start_date=None, end_date=None):
+    """Start an export on a background thread and return its job."""
+    discard_stale_exports()
+    job = ExportJob(fmt, plate_filter, start_date, end_date)
+    with _export_jobs_lock:
+        _export_jobs[job.job_id] = job
+    threading.Thread(target=job.run, name=f"export-{job.job_id}", daemon=True).start()
+    return job
+
+def get_export_job(job_id):
+    return _export_jobs.get(job_id)
+
+def discard_export_job(job_id):
+    """Forget a job and delete its file once it has been downloaded or abandoned."""
+    with _export_jobs_lock:
+        job = _export_jobs.pop(job_id, None)
+    if job and job.done and os.path.exists(job.path):
+        os.remove(job.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export vehicle history for audits.")
+    parser.add_argument("output", help="Output file path")
+    parser.add_argument("--format", choices=sorted(EXPORT_WRITERS), default="csv")
+    parser.add_argument("--plate", help="Plate number substring to filter on")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    def report(rows, rows_per_second):
+        print(f"\r{rows:,} rows ({rows_per_second:,.0f} rows/s)", end="", flush=True)
+
+    stats = export_vehicle_history(
+        args.output, args.format, args.plate, args.start, args.end, args.chunk_size, progress=report
+    )
+    print(f"\nExported {stats['rows']:,} rows in {stats['seconds']:.1f}s to {args.output}")
+
+if __name__ == "__main__":
+    main()
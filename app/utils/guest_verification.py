@@ -0,0 +1,139 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# How often the checker looks up the decisions for all waiting plates
+CHECK_INTERVAL_SECONDS = 2.0
+# Waiters that haven't been read for this long are dropped, e.g. when the guest closed the tab
+WAITER_TIMEOUT_SECONDS = 600.0
+
+
+@dataclass
+class Waiter:
+    """One guest waiting for a guard's decision on a registration made at `since`."""
+    plate_number: str
+    since: object
+    decision: object = None
+    last_seen: float = field(default_factory=time.monotonic)
+    event: threading.Event = field(default_factory=threading.Event)
+
+
+class GuestVerifier:
+    """
+    Shared registry of guests waiting for approval.
+    Waiting sessions block on an in-memory event instead of polling the database:
+    approve_guest/reject_guest wake them directly, and one background thread checks
+    every waiting plate in a single batched query to catch decisions made by other
+    processes. The thread only runs while someone is waiting.
+    """
+
+    def __init__(self, interval=CHECK_INTERVAL_SECONDS):
+        self.interval = interval
+        self.last_error = None
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def watch(self, waiter_id, plate_number, since):
+        """Register a session waiting for the decision on `plate_number` registered at `since`."""
+        with self._lock:
+            waiter = self._waiters.get(waiter_id)
+            if waiter is None or waiter.plate_number != plate_number:
+                self._waiters[waiter_id] = Waiter(plate_number, since)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="guest-verifier", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def discard(self, waiter_id):
+        with self._lock:
+            self._waiters.pop(waiter_id, None)
+
+    def waiter_count(self):
+        with self._lock:
+            return len(self._waiters)
+
+    def wait(self, waiter_id, timeout):
+        """
+        Block for up to `timeout` seconds until the waiter's registration is decided.
+        Returns True for approved, False for rejected and None if still pending.
+        """
+        with self._lock:
+            waiter = self._waiters.get(waiter_id)
+            if waiter is None:
+                return None
+            waiter.last_seen = time.monotonic()
+        waiter.event.wait(timeout)
+        return waiter.decision
+
+    def notify(self, plate_number, is_approved):
+        """Wake every session waiting on `plate_number` with the guard's decision."""
+        with self._lock:
+            waiters = [waiter for waiter in self._waiters.values() if waiter.plate_number == plate_number]
+        for waiter in waiters:
+            self._resolve(waiter, is_approved)
+
+    def _resolve(self, waiter, is_approved):
+        if waiter.decision is None and is_approved is not None:
+            waiter.decision = bool(is_approved)
+            waiter.event.set()
+
+    def _pending(self):
+        cutoff = time.monotonic() - WAITER_TIMEOUT_SECONDS
+        with self._lock:
+            for waiter_id, waiter in list(self._waiters.items()):
+                if waiter.last_seen < cutoff:
+                    del self._waiters[waiter_id]
+            return [waiter for waiter in self._waiters.values() if waiter.decision is None]
+
+    def check_once(self):
+        """Look up the decisions of every pending waiter in one query. Returns the number resolved."""
+        from app.database import fetch_guest_decisions
+
+        pending = self._pending()
+        if not pending:
+            return 0
+        decisions = fetch_guest_decisions(
+            {waiter.plate_number for waiter in pending},
+            min(waiter.since for waiter in pending),
+        )
+        resolved = 0
+        for waiter in pending:
+            decision = decisions.get(waiter.plate_number)
+            # Only decisions on this registration count, not passes from earlier visits
+            if decision and decision[1] >= waiter.since and decision[0] is not None:
+                self._resolve(waiter, decision[0])
+                resolved += 1
+        return resolved
+
+    def _run(self):
+        while True:
+            if not self._pending():
+                # Idle until a session starts waiting again
+                self._wakeup.clear()
+                if not self._pending():
+                    self._wakeup.wait()
+                continue
+            try:
+                self.check_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                logger.warning("Guest verification check failed: %s", e)
+            time.sleep(self.interval)
+
+
+_guest_verifier = None
+_guest_verifier_lock = threading.Lock()
+
+def get_guest_verifier():
+    """Process-wide guest verification registry shared by every session."""
+    global _guest_verifier
+    with _guest_verifier_lock:
+        if _guest_verifier is None:
+            _guest_verifier = GuestVerifier()
+        return _guest_verifier
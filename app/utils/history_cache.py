@@ -0,0 +1,125 @@
+import threading
+import time
+from datetime import datetime, timedelta
+import pandas as pd
+from app.database import fetch_vehicle_history_since
+from app.settings import TAIL_CACHE_MAX_ROWS, TAIL_CACHE_MAX_AGE_HOURS
+
+# Sessions refreshing within this window share the previous refresh
+TAIL_CACHE_MIN_REFRESH_SECONDS = 1.0
+
+COLUMNS = ["ID", "Plate Number", "Confidence", "Timestamp", "Registration Status"]
+
+
+class VehicleHistoryTailCache:
+    """
+    Keeps the most recent vehicle_history rows in a DataFrame, newest timestamp first.
+    vehicle_history is append-only, so each refresh only reads rows written after the
+    vehicle_history_id watermark and evicts rows past the count/age limits. Following the
+    id rather than the timestamp also picks up detections a gate reported late.
+    """
+
+    def __init__(self, max_rows=TAIL_CACHE_MAX_ROWS, max_age=timedelta(hours=TAIL_CACHE_MAX_AGE_HOURS)):
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._data = pd.DataFrame(columns=COLUMNS)
+        self._watermark = None
+        self._last_refresh = 0.0
+        # Rows with a timestamp after this are all present; None means the whole table is cached
+        self._complete_after = None
+        self._loaded = False
+        # Called with the new rows of every refresh and whether they connect to the previous ones
+        self._listeners = []
+
+    @property
+    def watermark(self):
+        return self._watermark
+
+    def add_listener(self, listener):
+        """Call `listener(new_rows, complete)` after every refresh that fetched rows."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def refresh(self, force=False):
+        """Append rows newer than the watermark and evict old ones. Returns the new rows."""
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < TAIL_CACHE_MIN_REFRESH_SECONDS:
+                return self._data.iloc[0:0]
+
+            new_rows = fetch_vehicle_history_since(self._watermark, limit=self.max_rows)
+            self._last_refresh = time.monotonic()
+            # Rows were skipped if there were too many new ones to reach back to the watermark
+            complete = self._watermark is None or len(new_rows) < self.max_rows
+
+            if len(new_rows) >= self.max_rows:
+                # Too many new rows to bridge the gap; the fetched window replaces the cache
+                self._data = new_rows
+                self._complete_after = new_rows['Timestamp'].min()
+            elif not new_rows.empty:
+                self._data = pd.concat([new_rows, self._data], ignore_index=True)
+            if not new_rows.empty:
+                # Late detections belong further down, not at the top
+                self._data = self._data.sort_values(["Timestamp", "ID"], ascending=False, ignore_index=True)
+                self._watermark = int(new_rows['ID'].max())
+            self._loaded = True
+            self._evict()
+            if not new_rows.empty:
+                for listener in self._listeners:
+                    listener(new_rows, complete)
+            return new_rows
+
+    def _evict(self):
+        """Drop rows beyond the row limit or older than the age limit."""
+        cutoff = datetime.now() - self.max_age
+        kept = self._data[pd.to_datetime(self._data['Timestamp']) >= cutoff].head(self.max_rows)
+        if len(kept) < len(self._data):
+            # Everything newer than the newest evicted row is still cached
+            boundary = self._data['Timestamp'].iloc[len(kept)]
+            self._complete_after = max(boundary, self._complete_after) if self._complete_after is not None else boundary
+            self._data = kept.reset_index(drop=True)
+
+    def covers(self, since):
+        """Whether every row with a timestamp at or after `since` is in the cache."""
+        return self._loaded and (self._complete_after is None or self._complete_after < since)
+
+    def snapshot(self):
+        """Copy of the cached rows, newest first."""
+        with self._lock:
+            return self._data.copy()
+
+    def rows_since(self, since):
+        """Cached rows at or after `since`, or None if the cache doesn't reach back that far."""
+        with self._lock:
+            if not self.covers(since):
+                return None
+            return self._data[pd.to_datetime(self._data['Timestamp']) >= since].copy()
+
+    def latest_page(self, page_size):
+        """
+        First unfiltered page of history in the same shape as fetch_vehicle_history_page.
+        Returns None if the cache holds too few rows to answer it.
+        """
+        with self._lock:
+            if not self._loaded or (len(self._data) <= page_size and self._complete_after is not None):
+                return None
+            page = self._data.head(page_size)
+            next_cursor = None
+            if len(self._data) > page_size:
+                next_cursor = (pd.Timestamp(page['Timestamp'].iloc[-1]).to_pydatetime(), int(page['ID'].iloc[-1]))
+
+        data = page.drop(columns=["ID"]).reset_index(drop=True)
+        data['Registration Status'] = data['Registration Status'].astype(int).replace({1: 'Registered', 0: 'Unregistered'})
+        return data, next_cursor
+
+
+_history_cache = None
+_history_cache_lock = threading.Lock()
+
+def get_history_cache():
+    """Process-wide tail cache shared by every session."""
+    global _history_cache
+    with _history_cache_lock:
+        if _history_cache is None:
+            _history_cache = VehicleHistoryTailCache()
+        return _history_cache
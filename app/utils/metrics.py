@@ -0,0 +1,213 @@
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+import pandas as pd
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Recent samples kept per metric for percentiles
+SAMPLE_WINDOW = 1000
+
+# Name of the tracked query currently running in this thread, used to label raw statements
+current_query = contextvars.ContextVar("current_query", default=None)
+
+
+class LatencyStats:
+    """Latency histogram, call and row counters for one named query, statement or page."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_seconds = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def observe(self, seconds, rows=0, error=False):
+        self.calls += 1
+        self.errors += int(error)
+        self.rows += rows
+        self.total_seconds += seconds
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.samples.append(seconds)
+
+    def percentile(self, q):
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows_per_call": self.rows / self.calls if self.calls else 0.0,
+            "avg_ms": self.total_seconds / self.calls * 1000 if self.calls else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "max_ms": max(self.samples, default=0.0) * 1000,
+        }
+
+
+class MetricsRegistry:
+    """Process-wide latency stats grouped by kind: 'query', 'statement' and 'page'."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def observe(self, kind, name, seconds, rows=0, error=False):
+        with self._lock:
+            self._stats.setdefault((kind, name), LatencyStats()).observe(seconds, rows, error)
+
+    def table(self, kind):
+        """Summary of every metric of one kind as a DataFrame, slowest p95 first."""
+        with self._lock:
+            records = [{"name": name, **stats.summary()} for (k, name), stats in self._stats.items() if k == kind]
+        columns = ["name", "calls", "errors", "rows_per_call", "avg_ms", "p50_ms", "p95_ms", "max_ms"]
+        return pd.DataFrame(records, columns=columns).sort_values("p95_ms", ascending=False, ignore_index=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def to_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        metric_names = {
+            "query": ("scvacs_query_duration_seconds", "query"),
+            "statement": ("scvacs_sql_statement_duration_seconds", "query"),
+            "page": ("scvacs_page_render_duration_seconds", "page"),
+        }
+        lines = []
+        with self._lock:
+            items = sorted(self._stats.items())
+        for kind, (metric, label) in metric_names.items():
+            lines.append(f"# HELP {metric} Latency of each {kind}.")
+            lines.append(f"# TYPE {metric} histogram")
+            for (k, name), stats in items:
+                if k != kind:
+                    continue
+                name = name.replace("\\", "\\\\").replace('"', '\\"')
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label}="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label}="{name}",le="+Inf"}} {stats.calls}')
+                lines.append(f'{metric}_sum{{{label}="{name}"}} {stats.total_seconds}')
+                lines.append(f'{metric}_count{{{label}="{name}"}} {stats.calls}')
+        counters = {
+            "scvacs_query_rows_total": ("Rows returned by each query.", "rows"),
+            "scvacs_query_errors_total": ("Failed calls of each query.", "errors"),
+        }
+        for metric, (help_text, attribute) in counters.items():
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for (kind, name), stats in items:
+                if kind == "query":
+                    name = name.replace("\\", "\\\\").replace('"', '\\"')
+                    lines.append(f'{metric}{{query="{name}"}} {getattr(stats, attribute)}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+def count_rows(result):
+    """Best-effort row count of a query function's return value."""
+    if isinstance(result, tuple):
+        result = next((item for item in result if isinstance(item, pd.DataFrame)), None)
+    if isinstance(result, (pd.DataFrame, list, dict)):
+        return len(result)
+    return 0
+
+def track_query(name=None):
+    """Record latency, rows and calls of a database function under its name."""
+    def decorator(func):
+        query_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            token = current_query.set(query_name)
+            started = time.perf_counter()
+            error = False
+            result = None
+            try:
+                result = func(*args, **kwargs)
+                return result
+            except Exception:
+                error = True
+                raise
+            finally:
+                current_query.reset(token)
+                metrics.observe("query", query_name, time.perf_counter() - started, count_rows(result), error)
+
+        return wrapper
+    return decorator
+
+def track_page(name):
+    """Record render time of a page's render function."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            error = False
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                error = True
+                raise
+            finally:
+                metrics.observe("page", name, time.perf_counter() - started, error=error)
+
+        return wrapper
+    return decorator
+
+def attach_engine_metrics(engine):
+    """Time every SQL statement, labelled with the tracked query that issued it."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start_time"].pop()
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        metrics.observe("statement", current_query.get() or "untracked", time.perf_counter() - started, rows)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        starts = context.connection.info.get("query_start_time") if context.connection is not None else None
+        if starts:
+            started = starts.pop()
+            metrics.observe("statement", current_query.get() or "untracked", time.perf_counter() - started, error=True)
+
+
+_exporter_thread = None
+
+def start_prometheus_file_exporter(path, interval=15.0):
+    """Write the Prometheus text to `path` every `interval` seconds, e.g. for the node_exporter textfile collector."""
+    global _exporter_thread
+    if _exporter_thread is not None:
+        return
+
+    def run():
+        while True:
+            try:
+                temp_path = f"{path}.tmp"
+                with open(temp_path, "w") as f:
+                    f.write(metrics.to_prometheus())
+                os.replace(temp_path, path)
+            except OSError as e:
+                logger.warning("Could not write metrics file %s: %s", path, e)
+            time.sleep(interval)
+
+    _exporter_thread = threading.Thread(target=run, name="metrics-exporter", daemon=True)
+    _exporter_thread.start()
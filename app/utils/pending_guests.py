@@ -0,0 +1,85 @@
+import threading
+import time
+import pandas as pd
+
+# Sessions reading the feed within this window share the previous change check
+PENDING_FEED_MIN_REFRESH_SECONDS = 1.0
+
+COLUMNS = ["Guest ID", "Name", "Plate Number", "Vehicle Type", "Phone Number", "Visit Purpose", "Check-in Date", "Check-out Date"]
+
+
+class PendingGuestFeed:
+    """
+    Versioned copy of guest_temp shared by every session.
+    Each refresh reads a cheap (count, latest check-in) token; when it is unchanged the
+    cached DataFrame is served as is. When it changed only guests that checked in since
+    the previous token are fetched, and removals are found from the guest_id column alone.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = pd.DataFrame(columns=COLUMNS)
+        self._token = None
+        self._version = 0
+        self._last_refresh = 0.0
+
+    @property
+    def version(self):
+        """Increases every time the pending guests change."""
+        return self._version
+
+    def invalidate(self):
+        """Make the next read check the token again, e.g. right after a write."""
+        self._last_refresh = 0.0
+
+    def refresh(self, force=False):
+        """Bring the cached guests up to date. Returns True if they changed."""
+        from app.database import fetch_pending_guest_token, fetch_pending_guests, fetch_pending_guest_ids
+
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < PENDING_FEED_MIN_REFRESH_SECONDS:
+                return False
+            token = fetch_pending_guest_token()
+            self._last_refresh = time.monotonic()
+            if token == self._token:
+                return False
+
+            count, latest = token
+            if self._token is None or self._token[1] is None:
+                data = fetch_pending_guests()
+            else:
+                new_rows = fetch_pending_guests(since=self._token[1])
+                if list(new_rows.columns) != COLUMNS:
+                    return False
+                data = pd.concat([self._data, new_rows], ignore_index=True).drop_duplicates("Guest ID", keep="last")
+                if len(data) != count:
+                    data = data[data["Guest ID"].isin(fetch_pending_guest_ids())]
+                if len(data) != count:
+                    # Something changed that the delta can't explain, e.g. an edited check-in date
+                    data = fetch_pending_guests()
+            if list(data.columns) != COLUMNS:
+                # The fetch failed and already reported it; try again on the next read
+                return False
+
+            self._data = data.reset_index(drop=True)
+            self._token = token
+            self._version += 1
+            return True
+
+    def get(self):
+        """Current pending guests, refreshed if the table changed."""
+        self.refresh()
+        with self._lock:
+            return self._data.copy()
+
+
+_pending_guest_feed = None
+_pending_guest_feed_lock = threading.Lock()
+
+def get_pending_guest_feed():
+    """Process-wide pending guest feed shared by every session."""
+    global _pending_guest_feed
+    with _pending_guest_feed_lock:
+        if _pending_guest_feed is None:
+            _pending_guest_feed = PendingGuestFeed()
+        return _pending_guest_feed
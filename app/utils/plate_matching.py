@@ -0,0 +1,107 @@
+from dataclasses import dataclass
+from app.utils.plate_registry import normalize_plate
+
+# Characters OCR reads interchangeably; substituting within a group is cheap
+CONFUSION_GROUPS = ("O0DQ", "I1L", "B8", "S5", "Z2", "G6")
+
+# Edit costs: a confusable substitution, any other substitution, a dropped or extra character
+CONFUSION_COST = 0.3
+SUBSTITUTION_COST = 1.0
+INDEL_COST = 1.0
+
+# Reads at or below this confidence are matched approximately even when they match exactly
+LOW_CONFIDENCE_THRESHOLD = 0.8
+# Candidates further than this are not reported
+MAX_MATCH_DISTANCE = 1.0
+# A read is classified as its best candidate only within this distance and if no other ties it
+AUTO_MATCH_DISTANCE = 0.6
+
+_CANONICAL = {char: group[0] for group in CONFUSION_GROUPS for char in group}
+
+
+def canonical_plate(plate):
+    """Normalized plate with every confusable character replaced by its group's first one."""
+    return _canonical(normalize_plate(plate))
+
+def _canonical(normalized):
+    return "".join(_CANONICAL.get(char, char) for char in normalized)
+
+def substitution_cost(a, b):
+    if a == b:
+        return 0.0
+    if _CANONICAL.get(a, a) == _CANONICAL.get(b, b):
+        return CONFUSION_COST
+    return SUBSTITUTION_COST
+
+def plate_distance(a, b):
+    """Edit distance between two plates where confusable characters are cheap to swap."""
+    a, b = normalize_plate(a), normalize_plate(b)
+    previous = [j * INDEL_COST for j in range(len(b) + 1)]
+    for i, char_a in enumerate(a, 1):
+        current = [i * INDEL_COST]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + INDEL_COST,
+                current[j - 1] + INDEL_COST,
+                previous[j - 1] + substitution_cost(char_a, char_b),
+            ))
+        previous = current
+    return previous[-1]
+
+def deletions(text):
+    """`text` and every string with one character of it removed."""
+    return {text} | {text[:i] + text[i + 1:] for i in range(len(text))}
+
+
+@dataclass(frozen=True)
+class PlateCandidate:
+    """A known plate a read may have been, and how far the read is from it."""
+    plate: str
+    distance: float
+
+
+class PlateMatcher:
+    """
+    Approximate lookup of OCR reads among known plates.
+    Plates are indexed by their confusion-canonical form and each form with one character
+    deleted, so any number of confusions plus one dropped, extra or misread character is
+    found with a handful of dictionary lookups. Candidates are then ranked by plate_distance.
+    """
+
+    def __init__(self, plates=()):
+        self._index = {}
+        self._plates = set()
+        for plate in plates:
+            self.add(plate)
+
+    def __len__(self):
+        return len(self._plates)
+
+    def __contains__(self, plate):
+        return normalize_plate(plate) in self._plates
+
+    def add(self, plate):
+        plate = normalize_plate(plate)
+        if plate in self._plates:
+            return
+        self._plates.add(plate)
+        for key in deletions(_canonical(plate)):
+            self._index.setdefault(key, set()).add(plate)
+
+    def candidates(self, read, max_distance=MAX_MATCH_DISTANCE, limit=5):
+        """Known plates within `max_distance` of the read, nearest first."""
+        found = set()
+        for key in deletions(canonical_plate(read)):
+            found.update(self._index.get(key, ()))
+        ranked = sorted(
+            (PlateCandidate(plate, round(plate_distance(read, plate), 2)) for plate in found),
+            key=lambda candidate: (candidate.distance, candidate.plate),
+        )
+        return [candidate for candidate in ranked if candidate.distance <= max_distance][:limit]
+
+    def best_match(self, read):
+        """The single nearest plate within AUTO_MATCH_DISTANCE, or None if there is none or a tie."""
+        nearest = self.candidates(read, AUTO_MATCH_DISTANCE, limit=2)
+        if not nearest or (len(nearest) > 1 and nearest[1].distance == nearest[0].distance):
+            return None
+        return nearest[0]
@@ -0,0 +1,191 @@
+import re
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+# Guest passes are refreshed incrementally at most this often
+REGISTRY_REFRESH_SECONDS = 30
+# registered_vehicle has no change timestamp, so it is reloaded in full on this interval
+REGISTERED_RELOAD_SECONDS = 300
+
+GUEST_FIELDS = ("guest_name", "guest_phone_number", "visit_purpose", "check_in_date", "check_out_date", "is_approved")
+OWNER_FIELDS = (
+    "owner_name", "address", "owner_phone_number", "pass_expiry_date", "make", "model", "color", "vehicle_type"
+)
+
+# Separators found in stored plates; database.normalized_plate_column() strips these in SQL,
+# so keep them in line with what normalize_plate() removes
+PLATE_SEPARATORS = (" ", "-", ".", "/", "_", "'", ",", ":", "\t")
+
+def normalize_plate(plate):
+    """Uppercase a plate and strip spaces and punctuation so 'sab 1234' matches 'SAB1234'."""
+    return re.sub(r"[^A-Z0-9]", "", str(plate).upper()) if plate is not None else ""
+
+
+class PlateRegistry:
+    """
+    In-memory snapshot of registered vehicles and guest passes keyed by normalized plate,
+    so classifying a detection is a dictionary lookup instead of a join.
+    """
+
+    def __init__(self):
+        self.registered = {}
+        self.guests = {}
+        self.build_seconds = None
+        self.built_at = None
+        self._guest_watermark = None
+        self._registered_loaded_at = 0.0
+        self._refreshed_at = 0.0
+        self._stale = True
+        # Reentrant so ensure_fresh can hold it across the check and the build or refresh
+        self._lock = threading.RLock()
+        # Approximate matcher and the registered snapshot it was built from; the matcher is
+        # extended in place, so it is only read or changed while holding _matcher_lock
+        self._matcher = None
+        self._matcher_source = None
+        self._matcher_lock = threading.Lock()
+
+    def size(self):
+        """Number of registered plates and guest plates in the snapshot."""
+        return {"registered": len(self.registered), "guests": len(self.guests)}
+
+    def invalidate(self):
+        """Force a refresh on the next lookup, e.g. after a local guest write."""
+        self._stale = True
+
+    def build(self):
+        """Load both tables from scratch and swap in the new snapshot."""
+        from app.database import fetch_registered_vehicles, fetch_guest_passes
+
+        with self._lock:
+            started = time.perf_counter()
+            registered = {normalize_plate(row.number_plate): row for row in fetch_registered_vehicles()}
+            guests = {}
+            watermark = None
+            for row in fetch_guest_passes():
+                self._add_guest(guests, row)
+                watermark = row.created_at if watermark is None else max(watermark, row.created_at)
+
+            self.registered, self.guests = registered, guests
+            self._guest_watermark = watermark
+            self._registered_loaded_at = self._refreshed_at = time.monotonic()
+            self._stale = False
+            self.build_seconds = time.perf_counter() - started
+            self.built_at = datetime.now()
+
+    def refresh(self):
+        """Fetch guest passes created after the watermark and reload registrations when due."""
+        from app.database import fetch_registered_vehicles, fetch_guest_passes
+
+        with self._lock:
+            registered = self.registered
+            if time.monotonic() - self._registered_loaded_at > REGISTERED_RELOAD_SECONDS:
+                registered = {normalize_plate(row.number_plate): row for row in fetch_registered_vehicles()}
+                self._registered_loaded_at = time.monotonic()
+
+            guests = dict(self.guests)
+            for row in fetch_guest_passes(since=self._guest_watermark):
+                self._add_guest(guests, row)
+                if self._guest_watermark is None or row.created_at > self._guest_watermark:
+                    self._guest_watermark = row.created_at
+            self.registered, self.guests = registered, guests
+            self._refreshed_at = time.monotonic()
+            self._stale = False
+
+    def ensure_fresh(self):
+        """
+        Build on first use, then refresh when invalidated or past the refresh interval.
+        The check runs under the lock, so threads arriving together load the tables once.
+        """
+        with self._lock:
+            if self.built_at is None:
+                self.build()
+            elif self._stale or time.monotonic() - self._refreshed_at > REGISTRY_REFRESH_SECONDS:
+                self.refresh()
+
+    @staticmethod
+    def _add_guest(guests, row):
+        # Keep the most recent pass per plate
+        plate = normalize_plate(row.plate_number)
+        current = guests.get(plate)
+        if current is None or row.created_at >= current.created_at:
+            guests[plate] = row
+
+    def lookup(self, plate):
+        """Return (guest_row, registered_row) for a plate; either may be None."""
+        plate = normalize_plate(plate)
+        return self.guests.get(plate), self.registered.get(plate)
+
+    def matcher(self):
+        """
+        OCR-tolerant matcher over registered and approved guest plates. It is rebuilt when
+        registrations are reloaded; new approved guests are added to it as they appear.
+        Callers must hold _matcher_lock while calling this and while using the result.
+        """
+        from app.utils.plate_matching import PlateMatcher
+
+        registered, guests = self.registered, self.guests
+        if self._matcher_source != id(registered):
+            # Built fully before it replaces the previous matcher
+            matcher = PlateMatcher(registered)
+            self._matcher, self._matcher_source = matcher, id(registered)
+        for plate, row in guests.items():
+            if row.is_approved and plate not in self._matcher:
+                self._matcher.add(plate)
+        return self._matcher
+
+    def _match(self, plate, pick_best):
+        """Candidates for a read other than an exact match, and its best match when asked."""
+        with self._matcher_lock:
+            matcher = self.matcher()
+            # An exact entry is already shown; only alternatives are candidates
+            candidates = [
+                (candidate.plate, candidate.distance) for candidate in matcher.candidates(plate)
+                if candidate.distance > 0
+            ]
+            return candidates, matcher.best_match(plate) if pick_best else None
+
+    def resolve(self, detection):
+        """
+        Combine a vehicle_history row with its guest pass and registered vehicle entries
+        into a row with the guest and owner fields build_vehicle_detail expects.
+        Low-confidence reads and reads without an exact entry also get the nearest known
+        plates; a read with no entry is resolved as its best candidate if there is one.
+        """
+        from app.utils.plate_matching import LOW_CONFIDENCE_THRESHOLD
+
+        guest, registered = self.lookup(detection.plate_number)
+        fields = dict(detection._mapping)
+        fields.update(read_plate=None, match_distance=None, plate_candidates=[])
+        confidence = detection.confidence if detection.confidence is not None else 0
+        if (guest is None and registered is None) or confidence <= LOW_CONFIDENCE_THRESHOLD:
+            fields["plate_candidates"], best = self._match(
+                detection.plate_number, pick_best=guest is None and registered is None
+            )
+            if best is not None:
+                guest, registered = self.lookup(best.plate)
+                plate = registered.number_plate if registered is not None else guest.plate_number
+                fields.update(read_plate=detection.plate_number, plate_number=plate, match_distance=best.distance)
+                if registered is not None:
+                    # The detector classified the misread, not the plate it matched
+                    fields["registration_status"] = 1
+
+        for field in GUEST_FIELDS:
+            fields[field] = getattr(guest, field) if guest is not None else None
+        for field in OWNER_FIELDS:
+            use_owner = registered is not None and fields["registration_status"]
+            fields[field] = getattr(registered, field) if use_owner else None
+        return SimpleNamespace(**fields)
+
+
+_plate_registry = None
+_plate_registry_lock = threading.Lock()
+
+def get_plate_registry():
+    """Process-wide plate registry shared by every session."""
+    global _plate_registry
+    with _plate_registry_lock:
+        if _plate_registry is None:
+            _plate_registry = PlateRegistry()
+        return _plate_registry
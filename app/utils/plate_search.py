@@ -0,0 +1,146 @@
+import bisect
+import threading
+import time
+from app.utils.plate_registry import normalize_plate
+
+# Searches matching more plates than this fall back to a LIKE scan; long IN lists cost more than they save
+PLATE_SEARCH_MAX_PLATES = 1000
+
+# The index is rebuilt from the table this often, reconciling plates the tail cache feed
+# missed, e.g. rows committed out of id order by a concurrent writer
+PLATE_SEARCH_REBUILD_SECONDS = 900
+
+# Queries up to this long are looked up directly; longer ones intersect the postings of their trigrams
+GRAM_SIZE = 3
+
+
+def grams(text):
+    """Every substring of `text` up to GRAM_SIZE characters long."""
+    return {text[i:i + n] for n in range(1, GRAM_SIZE + 1) for i in range(len(text) - n + 1)}
+
+
+class PlateSearchIndex:
+    """
+    Substring and prefix index over the distinct plates in vehicle_history.
+    Plates are normalized like the plate registry does and every 1-3 character
+    substring points at the plates containing it, so a search intersects a few
+    small sets instead of scanning every detection. It is built from the table,
+    fed the new rows of each tail cache refresh and rebuilt every
+    PLATE_SEARCH_REBUILD_SECONDS in case the feed missed any.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # normalized plate -> plates as stored
+        self._plates = {}
+        # gram -> normalized plates containing it
+        self._postings = {}
+        self._sorted = []
+        self._stale = True
+        self._built_at = None
+        self.build_seconds = None
+
+    def size(self):
+        """Number of distinct normalized plates and of grams indexed."""
+        return {"plates": len(self._plates), "grams": len(self._postings)}
+
+    def invalidate(self):
+        """Rebuild from the table on the next search, e.g. after rows were missed."""
+        self._stale = True
+
+    def build(self):
+        """Load every distinct plate and swap in a new index."""
+        from app.database import fetch_distinct_plates
+
+        # Held throughout so tail rows arriving meanwhile are added after the build, not lost
+        with self._lock:
+            started = time.perf_counter()
+            plates, postings = {}, {}
+            for plate in fetch_distinct_plates():
+                self._add(plates, postings, plate)
+            self._plates, self._postings, self._sorted = plates, postings, sorted(plates)
+            self._stale = False
+            self._built_at = time.monotonic()
+            self.build_seconds = time.perf_counter() - started
+
+    @staticmethod
+    def _add(plates, postings, plate):
+        """Index one stored plate. Returns its normalized form if that is new, else None."""
+        key = normalize_plate(plate)
+        if not key:
+            return None
+        variants = plates.get(key)
+        if variants is not None:
+            variants.add(plate)
+            return None
+        plates[key] = {plate}
+        for gram in grams(key):
+            postings.setdefault(gram, set()).add(key)
+        return key
+
+    def add_rows(self, rows, complete=True):
+        """
+        Tail cache listener: index the plates of newly fetched detections.
+        `complete` is False when the refresh skipped rows, which forces a rebuild.
+        """
+        if not complete:
+            self.invalidate()
+            return
+        if rows.empty:
+            return
+        with self._lock:
+            if self._stale:
+                return
+            for plate in rows["Plate Number"].unique():
+                key = self._add(self._plates, self._postings, plate)
+                if key is not None:
+                    bisect.insort(self._sorted, key)
+
+    def _ensure_current(self):
+        from app.utils.history_cache import get_history_cache
+
+        if self._stale or time.monotonic() - self._built_at > PLATE_SEARCH_REBUILD_SECONDS:
+            self.build()
+        # New detections reach the index through the tail cache's refresh
+        get_history_cache().refresh()
+
+    def search(self, text, prefix=False):
+        """
+        Stored plates whose normalized form contains (or with `prefix`, starts with) the
+        normalized `text`, sorted. Returns None for an empty query.
+        """
+        query = normalize_plate(text)
+        if not query:
+            return None
+        self._ensure_current()
+        with self._lock:
+            if prefix:
+                start = bisect.bisect_left(self._sorted, query)
+                end = bisect.bisect_left(self._sorted, query + "\x7f")
+                keys = self._sorted[start:end]
+            elif len(query) <= GRAM_SIZE:
+                keys = self._postings.get(query, ())
+            else:
+                candidates = sorted(
+                    (self._postings.get(query[i:i + GRAM_SIZE], set()) for i in range(len(query) - GRAM_SIZE + 1)),
+                    key=len,
+                )
+                keys = set.intersection(*candidates) if candidates[0] else ()
+                # Trigrams can all occur without the whole query occurring
+                keys = [key for key in keys if query in key]
+            return sorted(plate for key in keys for plate in self._plates[key])
+
+
+_plate_search_index = None
+_plate_search_index_lock = threading.Lock()
+
+def get_plate_search_index():
+    """Process-wide plate search index, fed by the shared tail cache."""
+    from app.utils.history_cache import get_history_cache
+
+    global _plate_search_index
+    with _plate_search_index_lock:
+        if _plate_search_index is None:
+            _plate_search_index = PlateSearchIndex()
+            get_history_cache().add_listener(_plate_search_index.add_rows)
+        return _plate_search_index
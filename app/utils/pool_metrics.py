@@ -0,0 +1,114 @@
+import bisect
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# Upper bounds (milliseconds) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """Counters for one connection pool: checkouts, wait times, overflow, invalidations and connection age."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.overflow_checkouts = 0
+            self.peak_checked_out = 0
+            self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+            self.wait_total_ms = 0.0
+            self.wait_max_ms = 0.0
+            self._connected_at = {}
+
+    def record_wait(self, wait_ms):
+        with self._lock:
+            self.wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+            self.wait_total_ms += wait_ms
+            self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def attach(self, engine):
+        """Listen to the engine's pool events."""
+        pool = engine.pool
+
+        @event.listens_for(pool, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            with self._lock:
+                self.connects += 1
+                self._connected_at[id(dbapi_connection)] = time.monotonic()
+
+        @event.listens_for(pool, "close")
+        def on_close(dbapi_connection, connection_record):
+            with self._lock:
+                self._connected_at.pop(id(dbapi_connection), None)
+
+        @event.listens_for(pool, "checkout")
+        def on_checkout(dbapi_connection, connection_record, connection_proxy):
+            checked_out = pool.checkedout() if isinstance(pool, QueuePool) else 0
+            with self._lock:
+                self.checkouts += 1
+                self.peak_checked_out = max(self.peak_checked_out, checked_out)
+                if isinstance(pool, QueuePool) and pool.overflow() > 0:
+                    self.overflow_checkouts += 1
+
+        @event.listens_for(pool, "checkin")
+        def on_checkin(dbapi_connection, connection_record):
+            with self._lock:
+                self.checkins += 1
+
+        @event.listens_for(pool, "invalidate")
+        def on_invalidate(dbapi_connection, connection_record, exception):
+            with self._lock:
+                self.invalidations += 1
+
+    def snapshot(self, engine=None):
+        """Current metrics as a dict, including live pool state when an engine is given."""
+        now = time.monotonic()
+        with self._lock:
+            ages = sorted(now - connected_at for connected_at in self._connected_at.values())
+            waits = sum(self.wait_histogram)
+            data = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "overflow_checkouts": self.overflow_checkouts,
+                "peak_checked_out": self.peak_checked_out,
+                "wait_ms_avg": self.wait_total_ms / waits if waits else 0.0,
+                "wait_ms_max": self.wait_max_ms,
+                "wait_ms_histogram": {
+                    **{f"<={bound}": count for bound, count in zip(WAIT_BUCKETS_MS, self.wait_histogram)},
+                    f">{WAIT_BUCKETS_MS[-1]}": self.wait_histogram[-1],
+                },
+                "open_connections": len(ages),
+                "connection_age_s_max": ages[-1] if ages else 0.0,
+                "connection_age_s_avg": sum(ages) / len(ages) if ages else 0.0,
+            }
+        if engine is not None and isinstance(engine.pool, QueuePool):
+            data.update({
+                "pool_size": engine.pool.size(),
+                "checked_out": engine.pool.checkedout(),
+                "overflow": engine.pool.overflow(),
+            })
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record_wait((time.perf_counter() - started) * 1000)
@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+import pandas as pd
+
+# Upper bound on cached results across all functions
+QUERY_CACHE_MAX_ENTRIES = 512
+
+
+class QueryCache:
+    """
+    Process-wide cache of query results shared by every session.
+    Entries are keyed by function name and arguments, expire after the function's TTL
+    and are evicted least-recently-used once the cache is full.
+    Every invalidation advances the function's generation, so a result read before a
+    write but stored after its invalidation is dropped instead of cached.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._generations = {}
+        # Advanced by invalidations of every function
+        self._generation = 0
+
+    def _stat(self, name):
+        return self._stats.setdefault(name, {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0})
+
+    def get(self, key):
+        """Return (True, value) for a live entry, otherwise (False, None)."""
+        name = key[0]
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self._stat(name)["hits"] += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self._stat(name)["misses"] += 1
+            return False, None
+
+    def generation(self, name):
+        """Token to pass to set() for a result of `name` about to be read."""
+        with self._lock:
+            return (self._generation, self._generations.get(name, 0))
+
+    def set(self, key, value, ttl, generation=None):
+        """Store a result, unless `name` was invalidated since its generation() was taken."""
+        with self._lock:
+            if generation is not None and generation != (self._generation, self._generations.get(key[0], 0)):
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._stat(evicted_key[0])["evictions"] += 1
+
+    def invalidate(self, *names):
+        """Drop every entry of the named functions, or everything if no names are given."""
+        with self._lock:
+            if names:
+                for name in names:
+                    self._generations[name] = self._generations.get(name, 0) + 1
+            else:
+                self._generation += 1
+            for key in list(self._entries):
+                if not names or key[0] in names:
+                    del self._entries[key]
+                    self._stat(key[0])["invalidations"] += 1
+
+    def stats(self):
+        """Hit/miss counters per function plus the current number of entries."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "functions": {name: dict(counts) for name, counts in self._stats.items()},
+            }
+
+
+query_cache = QueryCache()
+_uncached = threading.local()
+
+def _copy(value):
+    # DataFrames are mutated by the pages, so callers always get their own copy
+    return value.copy() if isinstance(value, pd.DataFrame) else value
+
+def skip_caching():
+    """Keep the current cached_query call's result out of the cache, e.g. an error placeholder."""
+    _uncached.skip = True
+
+def cached_query(ttl, name=None, skip_args=0):
+    """
+    Cache a read function's result in the shared query cache for `ttl` seconds.
+    `skip_args` leading positional arguments (e.g. a connection) are left out of the key.
+    Results the function marks with skip_caching() and results that raise are not cached.
+    """
+    def decorator(func):
+        cache_name = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (cache_name, args[skip_args:], tuple(sorted(kwargs.items())))
+            found, value = query_cache.get(key)
+            if found:
+                return _copy(value)
+            generation = query_cache.generation(cache_name)
+            _uncached.skip = False
+            value = func(*args, **kwargs)
+            if not _uncached.skip:
+                query_cache.set(key, _copy(value), ttl, generation)
+            return value
+
+        return wrapper
+    return decorator
+
+def invalidate_queries(*names):
+    """Drop cached results of the named read functions after a write."""
+    query_cache.invalidate(*names)
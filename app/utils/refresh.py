@@ -0,0 +1,163 @@
+"""
+Adaptive refresh for the live views.
+
+Each live view is a fragment that reruns on its own at the view's fastest interval.
+It only loads data while that data keeps changing; while it doesn't, loads back off
+exponentially up to the view's slowest interval and snap back on the next change.
+Sessions nobody has interacted with and whose data hasn't changed for a while drop to
+an idle heartbeat. The effective rates are collected per view for the Performance page.
+"""
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+import pandas as pd
+import streamlit as st
+
+# Session state key used by the scheduler; pages that reset session state must keep it
+SESSION_KEY = "refresh_scheduler"
+
+# Refresh interval of idle sessions, effectively pausing them until someone interacts
+IDLE_INTERVAL_SECONDS = 600.0
+
+
+@dataclass(frozen=True)
+class RefreshPolicy:
+    """How fast a view refreshes: `min_seconds` while data changes, backing off to `max_seconds`."""
+    min_seconds: float
+    max_seconds: float
+    backoff: float = 2.0
+    # Seconds without interaction or data changes before the view idles; None never idles
+    idle_after_seconds: float = 600.0
+
+
+REFRESH_POLICIES = {
+    "vehicle_history": RefreshPolicy(1, 15),
+    # Gate screens are watched, not clicked, so they never idle. Their data is the detection
+    # poller's in-memory event, which backing off would only show later without saving a query
+    "vehicle_details": RefreshPolicy(1, 1, idle_after_seconds=None),
+    "guest_registrations": RefreshPolicy(2, 30),
+    "pending_guests": RefreshPolicy(2, 20),
+    "analytics_cards": RefreshPolicy(30, 300),
+    "analytics_charts": RefreshPolicy(60, 600),
+}
+
+
+class RefreshStats:
+    """Current refresh interval of every session per view, for reporting effective rates."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._intervals = {}
+
+    def record(self, view, session_id, interval, idle):
+        with self._lock:
+            self._intervals.setdefault(view, {})[session_id] = (interval, idle, time.monotonic())
+
+    def table(self):
+        """Per view: active sessions, their intervals and the combined refreshes per minute."""
+        now = time.monotonic()
+        records = []
+        with self._lock:
+            for view, sessions in sorted(self._intervals.items()):
+                # A session is gone once it missed two of its own refreshes
+                for session_id, (interval, idle, seen) in list(sessions.items()):
+                    if now - seen > 2 * interval + 5:
+                        del sessions[session_id]
+                intervals = [interval for interval, idle, seen in sessions.values()]
+                if not intervals:
+                    continue
+                records.append({
+                    "view": view,
+                    "sessions": len(intervals),
+                    "idle_sessions": sum(idle for interval, idle, seen in sessions.values()),
+                    "min_interval_s": min(intervals),
+                    "median_interval_s": float(pd.Series(intervals).median()),
+                    "refreshes_per_min": sum(60 / interval for interval in intervals),
+                })
+        columns = ["view", "sessions", "idle_sessions", "min_interval_s", "median_interval_s", "refreshes_per_min"]
+        return pd.DataFrame(records, columns=columns)
+
+
+refresh_stats = RefreshStats()
+
+def frame_version(df):
+    """Cheap content version of a small DataFrame, for views without a version of their own."""
+    if not isinstance(df, pd.DataFrame):
+        return df
+    return (len(df), int(pd.util.hash_pandas_object(df, index=False).sum()) if not df.empty else 0)
+
+def _scheduler_state():
+    return st.session_state.setdefault(SESSION_KEY, {
+        "session_id": str(uuid.uuid4()),
+        "views": {},
+        "active_at": time.monotonic(),
+    })
+
+def note_activity():
+    """
+    Call at the start of every full script run. Fragments rerun on their own without a
+    full run, so full runs come from the user: they keep the session out of idle and
+    make every view load fresh data.
+    """
+    _scheduler_state()["active_at"] = time.monotonic()
+
+def expire_view(view):
+    """Make the next run of `view` load fresh data, e.g. after the user changed it."""
+    view_state = _scheduler_state()["views"].get(view)
+    if view_state is not None:
+        view_state["loaded_at"] = None
+
+def next_interval(view, data_version, policy=None):
+    """Record the latest data version of `view` and return its next refresh interval in seconds."""
+    policy = policy or REFRESH_POLICIES[view]
+    state = _scheduler_state()
+    now = time.monotonic()
+    view_state = state["views"].get(view)
+    if view_state is None or view_state["version"] != data_version:
+        view_state = {"interval": policy.min_seconds, "version": data_version, "changed_at": now}
+        state["views"][view] = view_state
+    else:
+        view_state["interval"] = min(view_state["interval"] * policy.backoff, policy.max_seconds)
+
+    interval = view_state["interval"]
+    last_activity = max(view_state["changed_at"], state["active_at"])
+    idle = policy.idle_after_seconds is not None and now - last_activity > policy.idle_after_seconds
+    if idle:
+        interval = max(interval, IDLE_INTERVAL_SECONDS)
+    view_state["effective_interval"] = interval
+    refresh_stats.record(view, state["session_id"], interval, idle)
+    return interval
+
+def _is_due(view_state, key, active_at):
+    if view_state is None or "data" not in view_state or view_state["key"] != key:
+        return True
+    loaded_at = view_state["loaded_at"]
+    if loaded_at is None or active_at > loaded_at:
+        return True
+    return time.monotonic() - loaded_at >= view_state["effective_interval"]
+
+def refresh_view(view, load, version=frame_version, key=None, complete=None):
+    """
+    Data of `view` for this run. `load` is only called once the view's adaptive interval
+    has elapsed, the user ran the script since the last load or `key` (e.g. the view's
+    filters) changed; otherwise the previously loaded data is returned.
+    `version(data)` must change whenever the data does. Data for which `complete(data)`
+    is false (e.g. a query still running) is shown but loaded again on the next run.
+    """
+    state = _scheduler_state()
+    view_state = state["views"].get(view)
+    if not _is_due(view_state, key, state["active_at"]):
+        return view_state["data"]
+
+    data = load()
+    # A different key is different data, so it starts at the fastest rate
+    data_version = (key, version(data))
+    next_interval(view, data_version)
+    loaded_at = time.monotonic() if complete is None or complete(data) else None
+    state["views"][view].update(data=data, key=key, loaded_at=loaded_at)
+    return data
+
+def live_fragment(view):
+    """Decorator turning a panel into a fragment that reruns at `view`'s fastest refresh interval."""
+    return st.fragment(run_every=REFRESH_POLICIES[view].min_seconds)
@@ -0,0 +1,273 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+import pandas as pd
+from sqlalchemy.engine import make_url
+from app import settings
+from app.database import fetch_vehicle_history_since
+
+# Rows read from vehicle_history per round trip while catching up
+ROLLUP_BATCH_SIZE = 10000
+# Sessions updating within this window share the previous update
+ROLLUP_MIN_UPDATE_SECONDS = 5.0
+
+# Chart windows answered from the rollups, in days
+WINDOWS = {"Today": 1, "Last 7 Days": 7, "Last 30 Days": 30, "Last 365 Days": 365}
+
+HOUR_FORMAT = "%Y-%m-%d %H:00:00"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hourly_rollup (
+    hour_start TEXT NOT NULL,
+    registration_status INTEGER NOT NULL,
+    detections INTEGER NOT NULL,
+    PRIMARY KEY (hour_start, registration_status)
+);
+CREATE TABLE IF NOT EXISTS hourly_plates (
+    hour_start TEXT NOT NULL,
+    registration_status INTEGER NOT NULL,
+    plate_number TEXT NOT NULL,
+    PRIMARY KEY (hour_start, registration_status, plate_number)
+);
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    timestamp TEXT NOT NULL,
+    vehicle_history_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_source (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    database_url TEXT NOT NULL
+);
+"""
+
+
+def database_source(url):
+    """The database rollups are computed from, as its URL without the password."""
+    return make_url(url).render_as_string(hide_password=True) if url else ""
+
+def default_rollup_path(source):
+    """SCVACS_ROLLUP_DB, or a file of its own per source database so their rollups never mix."""
+    if settings.ROLLUP_DB_PATH:
+        return settings.ROLLUP_DB_PATH
+    return f"scvacs_rollups_{hashlib.sha1(source.encode()).hexdigest()[:10]}.sqlite3"
+
+
+class RollupStore:
+    """
+    Per-hour detection counts and distinct plates by registration status, kept in SQLite.
+    The store catches up from a vehicle_history_id watermark, so each update only reads
+    detections written since the last one, including ones a gate reported late.
+    The file may be shared by several processes (app, CLI, benchmarks); each batch is
+    applied in a write transaction that first checks the watermark hasn't moved. The file
+    records the database it was built from and refuses to serve any other.
+    """
+
+    def __init__(self, path=None, source=None):
+        self.source = database_source(settings.DATABASE_URL) if source is None else source
+        self.path = path or default_rollup_path(self.source)
+        self._lock = threading.Lock()
+        self._last_update = 0.0
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+        with self._transaction() as db:
+            row = db.execute("SELECT database_url FROM rollup_source").fetchone()
+            if row is None:
+                db.execute("INSERT INTO rollup_source (id, database_url) VALUES (1, ?)", (self.source,))
+            elif row[0] != self.source:
+                raise RuntimeError(
+                    f"{self.path} holds rollups of {row[0]}, not {self.source}; "
+                    "set SCVACS_ROLLUP_DB to another file"
+                )
+
+    @contextmanager
+    def _connect(self):
+        """One SQLite transaction, committed on success and always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @contextmanager
+    def _transaction(self):
+        """
+        A write transaction begun with BEGIN IMMEDIATE: it holds the file's write lock from the
+        start, so what it reads can't be changed by another process before it commits.
+        """
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _read_watermark(db):
+        row = db.execute("SELECT vehicle_history_id FROM rollup_watermark").fetchone()
+        return row[0] if row else None
+
+    @property
+    def watermark(self):
+        """vehicle_history_id of the last detection folded in, or None."""
+        with self._connect() as db:
+            return self._read_watermark(db)
+
+    @staticmethod
+    def _apply(db, rows):
+        """Add a batch of vehicle_history rows to the hourly buckets."""
+        rows = rows.assign(
+            hour_start=pd.to_datetime(rows['Timestamp']).dt.floor("h").dt.strftime(HOUR_FORMAT),
+            status=rows['Registration Status'].astype(int),
+        )
+        counts = rows.groupby(["hour_start", "status"]).size()
+        db.executemany(
+            """
+            INSERT INTO hourly_rollup (hour_start, registration_status, detections) VALUES (?, ?, ?)
+            ON CONFLICT (hour_start, registration_status) DO UPDATE SET detections = detections + excluded.detections
+            """,
+            [(hour, int(status), int(count)) for (hour, status), count in counts.items()],
+        )
+        plates = rows[["hour_start", "status", "Plate Number"]].drop_duplicates()
+        db.executemany(
+            "INSERT OR IGNORE INTO hourly_plates (hour_start, registration_status, plate_number) VALUES (?, ?, ?)",
+            [(hour, int(status), plate) for hour, status, plate in plates.itertuples(index=False)],
+        )
+
+    @staticmethod
+    def _set_watermark(db, rows):
+        # Rows are read in id order; the timestamp is kept for reference only
+        last = rows.iloc[-1]
+        db.execute(
+            "INSERT OR REPLACE INTO rollup_watermark (id, timestamp, vehicle_history_id) VALUES (1, ?, ?)",
+            (pd.Timestamp(last['Timestamp']).isoformat(), int(last['ID'])),
+        )
+
+    def update(self, force=False):
+        """Fold detections newer than the watermark into the rollups. Returns the number of rows read."""
+        with self._lock:
+            if not force and time.monotonic() - self._last_update < ROLLUP_MIN_UPDATE_SECONDS:
+                return 0
+            watermark = self.watermark
+            total = 0
+            while True:
+                rows = fetch_vehicle_history_since(watermark, limit=ROLLUP_BATCH_SIZE, oldest_first=True)
+                if rows.empty:
+                    break
+                # Buckets and watermark move together, so an interrupted update never double counts
+                with self._transaction() as db:
+                    current = self._read_watermark(db)
+                    if current == watermark:
+                        self._apply(db, rows)
+                        self._set_watermark(db, rows)
+                if current != watermark:
+                    # Another process folded in rows meanwhile; carry on from where it got to
+                    watermark = current
+                    continue
+                total += len(rows)
+                watermark = int(rows.iloc[-1]['ID'])
+                if len(rows) < ROLLUP_BATCH_SIZE:
+                    break
+            self._last_update = time.monotonic()
+            return total
+
+    def rebuild(self, start, end):
+        """
+        Recompute the buckets for hours in [start, end) from vehicle_history.
+        Detections past the watermark are left to the next update.
+        """
+        start = pd.Timestamp(start).floor("h").to_pydatetime()
+        end = pd.Timestamp(end).ceil("h").to_pydatetime()
+        with self._lock:
+            # The watermark is read in the same write transaction that refills the range,
+            # so no update in this or another process can move it in between
+            with self._transaction() as db:
+                watermark = self._read_watermark(db)
+                if watermark is not None:
+                    bounds = (start.strftime(HOUR_FORMAT), end.strftime(HOUR_FORMAT))
+                    db.execute("DELETE FROM hourly_rollup WHERE hour_start >= ? AND hour_start < ?", bounds)
+                    db.execute("DELETE FROM hourly_plates WHERE hour_start >= ? AND hour_start < ?", bounds)
+                    cursor = None
+                    while True:
+                        rows = fetch_vehicle_history_since(
+                            cursor, limit=ROLLUP_BATCH_SIZE, oldest_first=True, start=start, until=end,
+                            through_id=watermark,
+                        )
+                        if not rows.empty:
+                            self._apply(db, rows)
+                        if len(rows) < ROLLUP_BATCH_SIZE:
+                            break
+                        cursor = int(rows.iloc[-1]['ID'])
+        if watermark is None:
+            # Nothing folded in yet, so there is nothing to correct; catch up instead
+            self.update(force=True)
+
+    def _query(self, sql, params):
+        with self._connect() as db:
+            return pd.read_sql_query(sql, db, params=params)
+
+    def daily_trends(self, start, end):
+        """Per-day detections in [start, end) in the shape of get_vehicle_trends."""
+        return self._query(
+            """
+            SELECT
+                substr(hour_start, 1, 10) as date,
+                SUM(detections) as total_vehicles,
+                SUM(CASE WHEN registration_status = 0 THEN detections ELSE 0 END) as unauthorized,
+                SUM(CASE WHEN registration_status = 1 THEN detections ELSE 0 END) as authorized
+            FROM hourly_rollup
+            WHERE hour_start >= ? AND hour_start < ?
+            GROUP BY substr(hour_start, 1, 10)
+            ORDER BY date
+            """,
+            (start.strftime(HOUR_FORMAT), end.strftime(HOUR_FORMAT)),
+        )
+
+    def hourly_distribution(self, start, end):
+        """Detections per hour of day in [start, end) in the shape of the hourly chart data."""
+        return self._query(
+            """
+            SELECT CAST(substr(hour_start, 12, 2) AS INTEGER) as hour, SUM(detections) as count
+            FROM hourly_rollup
+            WHERE hour_start >= ? AND hour_start < ?
+            GROUP BY CAST(substr(hour_start, 12, 2) AS INTEGER)
+            ORDER BY hour
+            """,
+            (start.strftime(HOUR_FORMAT), end.strftime(HOUR_FORMAT)),
+        )
+
+    def distinct_plates(self, start, end, registration_status=None):
+        """Number of distinct plates seen in [start, end), optionally for one registration status."""
+        sql = "SELECT COUNT(DISTINCT plate_number) FROM hourly_plates WHERE hour_start >= ? AND hour_start < ?"
+        params = [start.strftime(HOUR_FORMAT), end.strftime(HOUR_FORMAT)]
+        if registration_status is not None:
+            sql += " AND registration_status = ?"
+            params.append(registration_status)
+        with self._connect() as db:
+            return db.execute(sql, params).fetchone()[0]
+
+
+def window_range(window):
+    """[start, end) for a named window, ending at the start of tomorrow."""
+    end = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    return end - timedelta(days=WINDOWS[window]), end
+
+
+_rollup_store = None
+_rollup_store_lock = threading.Lock()
+
+def get_rollup_store():
+    """Process-wide rollup store shared by every session."""
+    global _rollup_store
+    with _rollup_store_lock:
+        if _rollup_store is None:
+            _rollup_store = RollupStore()
+        return _rollup_store
@@ -1,7 +1,14 @@
 import streamlit as st
 
-def set_logged_in():
+# Users allowed to see admin-only pages such as Performance
+ADMIN_USERS = {"ramesh"}
+
+def set_logged_in(username=None):
     st.session_state["logged_in"] = True
+    st.session_state["username"] = username
 
 def is_logged_in():
     return st.session_state.get("logged_in", False)
+
+def is_admin():
+    return is_logged_in() and st.session_state.get("username") in ADMIN_USERS
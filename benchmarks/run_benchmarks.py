@@ -0,0 +1,206 @@
+"""
+Time the database functions and report builder against synthetic data of several sizes.
+
+Each size is loaded into its own database (SQLite files under --data-dir by default) and
+measured in a fresh interpreter, so settings such as SCVACS_DATABASE_URL are picked up
+the same way the app reads them. Results are written as JSON for comparing versions.
+
+    python -m benchmarks.run_benchmarks --sizes 10000 100000 1000000 --output results.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+
+def benchmark_cases():
+    """Name and zero-argument callable for every function that is timed."""
+    from app import database as db
+    from app.pages.analytics import generate_excel_report
+    from app.utils.plate_search import get_plate_search_index
+
+    def with_connection(func):
+        def run():
+            with db.get_engine().connect() as conn:
+                return func(conn)
+        return run
+
+    def excel_report():
+        with db.get_engine().connect() as conn:
+            summary = db.get_todays_traffic_summary(conn)
+            return generate_excel_report(
+                db.get_vehicle_trends(conn),
+                summary["hourly"],
+                db.get_todays_vehicle_history(conn),
+                db.get_todays_guests(conn),
+            )
+
+    return {
+        "fetch_vehicle_history": db.fetch_vehicle_history,
+        "fetch_vehicle_history_page": db.fetch_vehicle_history_page,
+        "fetch_vehicle_history_page_filtered": lambda: db.fetch_vehicle_history_page(plate_filter="SA"),
+        "plate_search": lambda: get_plate_search_index().search("SA"),
+        "fetch_vehicle_history_since": db.fetch_vehicle_history_since,
+        "get_latest_vehicle_detail": db.get_latest_vehicle_detail,
+        "fetch_recent_registrations": db.fetch_recent_registrations,
+        "fetch_pending_guests": db.fetch_pending_guests,
+        "fetch_pending_guest_token": db.fetch_pending_guest_token,
+        "get_todays_traffic_summary": with_connection(db.get_todays_traffic_summary),
+        "get_guest_passes_issued": with_connection(db.get_guest_passes_issued),
+        "get_vehicle_trends": with_connection(db.get_vehicle_trends),
+        "get_todays_vehicle_history": with_connection(db.get_todays_vehicle_history),
+        "get_todays_guests": with_connection(db.get_todays_guests),
+        "generate_excel_report": excel_report,
+    }
+
+
+def row_count(result):
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, bytes):
+        return None
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def time_case(func, repeats):
+    """Run `func` `repeats` times with a cold query cache and summarise the timings."""
+    from app.utils.query_cache import query_cache
+
+    timings = []
+    result = None
+    for _ in range(repeats):
+        query_cache.invalidate()
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    # Query functions report failures as a string instead of raising
+    if isinstance(result, str) or (isinstance(result, tuple) and isinstance(result[0], str)):
+        raise RuntimeError(result if isinstance(result, str) else result[0])
+    return {
+        "min_ms": min(timings),
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.fmean(timings),
+        "max_ms": max(timings),
+        "rows": row_count(result),
+    }
+
+
+def run_worker(repeats, only=None):
+    """Time every case against the database in SCVACS_DATABASE_URL and print the results as JSON."""
+    results = {}
+    for name, func in benchmark_cases().items():
+        if only and name not in only:
+            continue
+        try:
+            # One untimed call so connection setup and registry builds are not measured
+            func()
+            results[name] = time_case(func, repeats)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {str(e).strip().splitlines()[0]}"}
+    print(json.dumps(results))
+
+
+def run_size(size, database_url, repeats, seed, reuse, only, drop_existing=False):
+    from sqlalchemy import create_engine, func, select
+    from benchmarks.synthetic_data import generate, vehicle_history
+
+    engine = create_engine(database_url)
+    load_seconds = None
+    with engine.connect() as conn:
+        existing = None
+        if reuse and engine.dialect.has_table(conn, "vehicle_history"):
+            existing = conn.execute(select(func.count()).select_from(vehicle_history)).scalar()
+    if existing != size:
+        started = time.perf_counter()
+        generate(engine, size, seed, drop_existing=drop_existing)
+        load_seconds = time.perf_counter() - started
+    engine.dispose()
+
+    command = [sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", "--repeats", str(repeats)]
+    if only:
+        command += ["--only", *only]
+    env = {**os.environ, "SCVACS_DATABASE_URL": database_url}
+    completed = subprocess.run(command, env=env, capture_output=True, text=True, cwd=Path(__file__).resolve().parent.parent)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "worker failed")
+    return {
+        "rows": size,
+        "load_seconds": load_seconds,
+        "functions": json.loads(completed.stdout.strip().splitlines()[-1]),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SCVACS queries against synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="vehicle_history row counts")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--data-dir", default="benchmark_data", help="Directory for the SQLite databases")
+    parser.add_argument("--database-url", help="Benchmark a single size against this database instead of SQLite")
+    parser.add_argument("--reuse", action="store_true", help="Skip loading when a database already has the size")
+    parser.add_argument("--drop-existing", action="store_true",
+                        help="Let --database-url replace existing tables on databases other than SQLite")
+    parser.add_argument("--only", nargs="+", help="Only time these functions")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.repeats, args.only)
+        return
+
+    if args.database_url and len(args.sizes) > 1:
+        parser.error("--database-url takes a single --sizes value")
+
+    from benchmarks.synthetic_data import ExistingTablesError
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeats": args.repeats,
+        "seed": args.seed,
+        "sizes": [],
+    }
+    for size in args.sizes:
+        if args.database_url:
+            database_url = args.database_url
+        else:
+            Path(args.data_dir).mkdir(parents=True, exist_ok=True)
+            database_url = f"sqlite:///{Path(args.data_dir) / f'vehicle_history_{size}.sqlite3'}"
+        print(f"Benchmarking {size:,} rows on {database_url.split('://')[0]}", file=sys.stderr)
+        try:
+            result = run_size(size, database_url, args.repeats, args.seed, args.reuse, args.only, args.drop_existing)
+        except ExistingTablesError as e:
+            parser.error(str(e))
+        report["sizes"].append({"database": database_url.split("://")[0], **result})
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output)
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
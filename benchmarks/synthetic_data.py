@@ -0,0 +1,197 @@
+"""
+Synthetic campus traffic for benchmarking.
+
+Generates users, registered vehicles, guest passes, pending guests and a vehicle_history
+of any size with weekday morning/lunch/evening peaks and realistic plate reuse, and loads
+it into any SQLAlchemy database (a local SQLite file by default).
+
+    python -m benchmarks.synthetic_data --rows 100000 --database-url sqlite:///bench.sqlite3
+
+Loading drops and recreates the tables. On anything but a local SQLite file it
+refuses to do that to existing tables unless drop_existing (--drop-existing) is given.
+"""
+import argparse
+import string
+import time
+import uuid
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import create_engine, insert
+from app.schema import guest, guest_temp, metadata, registered_vehicle, users, vehicle_history
+
+# Relative traffic per hour of day: morning, lunch and evening peaks, quiet nights
+HOURLY_WEIGHTS = np.array([
+    1, 1, 1, 1, 1, 2, 6, 18, 25, 14, 9, 10,
+    16, 14, 9, 9, 14, 22, 18, 8, 5, 4, 2, 1,
+], dtype=float)
+HOURLY_WEIGHTS /= HOURLY_WEIGHTS.sum()
+# Weekends see a fraction of weekday traffic
+WEEKEND_FACTOR = 0.3
+
+MAKES = [("Perodua", "Myvi"), ("Perodua", "Axia"), ("Proton", "Saga"), ("Proton", "X50"),
+         ("Honda", "City"), ("Toyota", "Vios"), ("Yamaha", "Y15ZR"), ("Honda", "Wave")]
+COLORS = ["White", "Silver", "Black", "Red", "Blue", "Grey"]
+VEHICLE_TYPES = ["Car", "Car", "Car", "Motorcycle", "Van"]
+PURPOSES = ["Delivery", "Meeting", "Grab pickup", "Visiting student", "Contractor", "Event"]
+
+BATCH_SIZE = 50000
+
+
+def make_plates(rng, count, prefix="S"):
+    """Sabah-style plates such as SAB1234A, unique within the returned array."""
+    letters = np.array(list(string.ascii_uppercase))
+    plates = set()
+    while len(plates) < count:
+        n = count - len(plates)
+        second = rng.choice(letters, n)
+        third = rng.choice(letters, n)
+        digits = rng.integers(1, 10000, n)
+        suffix = rng.choice(np.append(letters, ""), n)
+        plates.update(f"{prefix}{a}{b}{d}{s}" for a, b, d, s in zip(second, third, digits, suffix))
+    return np.array(sorted(plates))[rng.permutation(count)]
+
+
+def scale_for(rows):
+    """Population sizes that grow with the history size."""
+    return {
+        "users": max(50, min(rows // 40, 50000)),
+        "guests": max(20, min(rows // 200, 200000)),
+        "pending_guests": max(5, min(rows // 20000, 200)),
+        "unregistered_plates": max(100, min(rows // 20, 500000)),
+        "days": max(7, min(rows // 2000, 365)),
+    }
+
+
+def _insert(conn, table, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        conn.execute(insert(table), rows[start:start + BATCH_SIZE])
+
+
+# Backends of local stand-in files whose tables may be replaced without asking
+LOCAL_BACKENDS = ("sqlite",)
+
+
+class ExistingTablesError(RuntimeError):
+    """Loading would replace the tables of a database that isn't a local stand-in."""
+
+
+def check_replaceable(engine, drop_existing=False):
+    """Raise ExistingTablesError if loading would drop tables of a database that isn't a local stand-in."""
+    if drop_existing or engine.dialect.name in LOCAL_BACKENDS:
+        return
+    with engine.connect() as conn:
+        existing = [table.name for table in metadata.sorted_tables if engine.dialect.has_table(conn, table.name)]
+    if existing:
+        raise ExistingTablesError(
+            f"{engine.url.render_as_string(hide_password=True)} already has tables {', '.join(existing)}; "
+            "pass --drop-existing to replace them with synthetic data"
+        )
+
+
+def generate(engine, rows, seed=42, progress=None, drop_existing=False):
+    """
+    Create the schema and fill it with `rows` detections plus matching people and passes.
+    Existing tables are dropped, which check_replaceable() only allows on local stand-ins.
+    """
+    check_replaceable(engine, drop_existing)
+    rng = np.random.default_rng(seed)
+    scale = scale_for(rows)
+    now = datetime.now()
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    registered_plates = make_plates(rng, scale["users"], prefix="S")
+    guest_plates = make_plates(rng, scale["guests"], prefix="Q")
+    unregistered_plates = make_plates(rng, scale["unregistered_plates"], prefix="W")
+
+    with engine.begin() as conn:
+        _insert(conn, users, [
+            {"username": f"user{i}", "fullname": f"Campus User {i}", "address": f"Block {i % 40}, UMS",
+             "phone_number": f"01{rng.integers(10000000, 99999999)}"}
+            for i in range(scale["users"])
+        ])
+        _insert(conn, registered_vehicle, [
+            {"number_plate": plate, "username": f"user{i}", "pass_expiry_date": now + timedelta(days=int(rng.integers(-30, 365))),
+             "make": MAKES[i % len(MAKES)][0], "model": MAKES[i % len(MAKES)][1],
+             "color": COLORS[i % len(COLORS)], "vehicle_type": VEHICLE_TYPES[i % len(VEHICLE_TYPES)]}
+            for i, plate in enumerate(registered_plates)
+        ])
+        guest_rows = []
+        for i, plate in enumerate(guest_plates):
+            created_at = now - timedelta(days=float(rng.uniform(0, scale["days"])))
+            guest_rows.append({
+                "name": f"Guest {i}", "plate_number": plate, "id_number": f"ID{i:08d}",
+                "phone_number": f"01{rng.integers(10000000, 99999999)}", "email": f"guest{i}@example.com",
+                "address": "Kota Kinabalu", "visit_purpose": PURPOSES[i % len(PURPOSES)],
+                "check_in_date": created_at, "check_out_date": created_at + timedelta(hours=12),
+                "is_approved": bool(rng.random() < 0.9), "created_at": created_at,
+            })
+        _insert(conn, guest, guest_rows)
+        _insert(conn, guest_temp, [
+            {"guest_id": uuid.uuid4(), "name": f"Pending Guest {i}", "plate_number": plate,
+             "vehicle_type": "Car", "id_number": f"PD{i:08d}", "phone_number": "0123456789",
+             "email": None, "address": None, "visit_purpose": PURPOSES[i % len(PURPOSES)],
+             "check_in_date": now - timedelta(minutes=i), "check_out_date": now + timedelta(hours=1)}
+            for i, plate in enumerate(make_plates(rng, scale["pending_guests"], prefix="P"))
+        ])
+
+    # Most traffic is a few regulars (Zipf-like reuse); guests and strangers make up the rest
+    registered_weights = 1.0 / np.arange(1, len(registered_plates) + 1) ** 0.8
+    registered_weights /= registered_weights.sum()
+    unregistered_weights = 1.0 / np.arange(1, len(unregistered_plates) + 1) ** 1.1
+    unregistered_weights /= unregistered_weights.sum()
+
+    days = [date.today() - timedelta(days=offset) for offset in range(scale["days"] - 1, -1, -1)]
+    day_weights = np.array([WEEKEND_FACTOR if day.weekday() >= 5 else 1.0 for day in days])
+    rows_per_day = rng.multinomial(rows, day_weights / day_weights.sum())
+
+    written = 0
+    with engine.begin() as conn:
+        for day, count in zip(days, rows_per_day):
+            if count == 0:
+                continue
+            seconds = rng.choice(24, count, p=HOURLY_WEIGHTS) * 3600 + rng.integers(0, 3600, count)
+            seconds.sort()
+            kind = rng.choice(3, count, p=[0.7, 0.1, 0.2])
+            plates = np.where(
+                kind == 0, rng.choice(registered_plates, count, p=registered_weights),
+                np.where(kind == 1, rng.choice(guest_plates, count),
+                         rng.choice(unregistered_plates, count, p=unregistered_weights)),
+            )
+            confidence = np.round(rng.beta(12, 1.5, count), 4)
+            day_start = datetime.combine(day, datetime.min.time())
+            _insert(conn, vehicle_history, [
+                {"plate_number": plate, "confidence": float(conf),
+                 "timestamp": min(day_start + timedelta(seconds=int(second)), now),
+                 "registration_status": int(k == 0)}
+                for plate, conf, second, k in zip(plates, confidence, seconds, kind)
+            ])
+            written += int(count)
+            if progress:
+                progress(written, rows)
+    return scale
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load synthetic campus traffic into a database.")
+    parser.add_argument("--rows", type=int, default=100000, help="Number of vehicle_history rows")
+    parser.add_argument("--database-url", default="sqlite:///scvacs_bench.sqlite3")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--drop-existing", action="store_true",
+                        help="Replace existing tables on databases other than SQLite")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    engine = create_engine(args.database_url)
+
+    def report(written, total):
+        print(f"\r{written:,}/{total:,} detections", end="", flush=True)
+
+    try:
+        scale = generate(engine, args.rows, args.seed, progress=report, drop_existing=args.drop_existing)
+    except ExistingTablesError as e:
+        parser.error(str(e))
+    print(f"\nLoaded {args.rows:,} detections ({scale}) in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
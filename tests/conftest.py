@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import create_engine
+from app import database
+from app.schema import metadata
+from app.utils import history_cache, pending_guests, plate_registry, plate_search, query_cache
+
+
+@pytest.fixture
+def history_db(tmp_path, monkeypatch):
+    """Empty local database the app's queries run against, with no shared state from other tests."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'scvacs.sqlite3'}")
+    metadata.create_all(engine)
+    monkeypatch.setattr(database, "_engine", engine)
+    monkeypatch.setattr(query_cache, "query_cache", query_cache.QueryCache())
+    for module, name in (
+        (history_cache, "_history_cache"),
+        (pending_guests, "_pending_guest_feed"),
+        (plate_registry, "_plate_registry"),
+        (plate_search, "_plate_search_index"),
+    ):
+        monkeypatch.setattr(module, name, None)
+    yield engine
+    engine.dispose()
@@ -0,0 +1,130 @@
+import json
+import threading
+from datetime import datetime, timedelta
+from http.client import HTTPConnection
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app import database
+from app.ingest import Detection, DetectionIngestor, create_server
+from app.schema import vehicle_history
+
+READ_AT = datetime(2026, 3, 2, 8)
+
+
+def detections(count, gate="main"):
+    return [
+        Detection(f"SAB{i:04d}A", confidence=0.9, gate=gate, timestamp=READ_AT + timedelta(seconds=i))
+        for i in range(count)
+    ]
+
+
+def stored(engine):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(vehicle_history.c.plate_number, vehicle_history.c.timestamp).order_by(vehicle_history.c.vehicle_history_id)
+        ).fetchall()
+
+
+@pytest.fixture
+def ingestor(history_db, tmp_path):
+    ingestor = DetectionIngestor(queue_size=20, batch_size=10, flush_interval=0.01, rejects_path=str(tmp_path / "rejects.jsonl"))
+    yield ingestor
+    ingestor.close()
+
+
+@pytest.fixture
+def blocked_writes(monkeypatch):
+    """Holds every write until the returned event is set."""
+    release = threading.Event()
+    insert_detections = database.insert_detections
+
+    def blocked_insert(rows):
+        release.wait(5)
+        insert_detections(rows)
+
+    monkeypatch.setattr(database, "insert_detections", blocked_insert)
+    yield release
+    release.set()
+
+
+def test_detections_are_written_in_batches_with_the_gate_time(history_db, ingestor):
+    for detection in detections(25):
+        assert ingestor.submit(detection)
+    ingestor.flush()
+    rows = stored(history_db)
+    assert [row.plate_number for row in rows] == [detection.plate_number for detection in detections(25)]
+    assert rows[-1].timestamp == READ_AT + timedelta(seconds=24)
+    assert 3 <= ingestor.batches < 25
+    assert ingestor.stats()["gates"]["main"]["written"] == 25
+
+
+def test_a_full_queue_turns_gates_away(history_db, ingestor, blocked_writes):
+    accepted = [ingestor.submit(detection, timeout=0) for detection in detections(40)]
+    # Up to one batch is held by the blocked write, the rest fill the queue
+    assert 20 <= sum(accepted) <= 30
+    assert accepted[-1] is False
+    assert ingestor.stats()["gates"]["main"]["rejected"] == 40 - sum(accepted)
+
+    blocked_writes.set()
+    ingestor.flush()
+    assert len(stored(history_db)) == sum(accepted)
+
+
+def test_http_listener_answers_503_with_the_number_accepted(history_db, ingestor, blocked_writes):
+    server = create_server(ingestor, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        connection = HTTPConnection("127.0.0.1", server.server_address[1])
+        body = [{"plate_number": f"SAB{i:04d}A", "gate": "north"} for i in range(40)]
+        connection.request("POST", "/detections", json.dumps(body))
+        response = connection.getresponse()
+        assert response.status == 503
+        assert response.getheader("Retry-After") == "1"
+        accepted = json.loads(response.read())["accepted"]
+        assert 20 <= accepted < 40
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_transient_failures_are_retried_until_written(history_db, ingestor, monkeypatch):
+    insert_detections = database.insert_detections
+    failures = [OperationalError("INSERT", {}, Exception("database is locked"))] * 2
+
+    def flaky_insert(rows):
+        if failures:
+            raise failures.pop()
+        insert_detections(rows)
+
+    monkeypatch.setattr(database, "insert_detections", flaky_insert)
+    for detection in detections(5):
+        ingestor.submit(detection)
+    ingestor.flush()
+    assert len(stored(history_db)) == 5
+    assert ingestor.failed_writes == 2
+    assert ingestor.stats()["gates"]["main"]["set_aside"] == 0
+
+
+def test_rows_that_cannot_be_written_are_set_aside(history_db, ingestor, monkeypatch):
+    insert_detections = database.insert_detections
+
+    def insert_rejecting_one_plate(rows):
+        if any(row["plate_number"] == "SAB0003A" for row in rows):
+            raise IntegrityError("INSERT", {}, Exception("CHECK constraint failed"))
+        insert_detections(rows)
+
+    monkeypatch.setattr(database, "insert_detections", insert_rejecting_one_plate)
+    for detection in detections(8):
+        ingestor.submit(detection)
+    ingestor.flush()
+
+    assert [row.plate_number for row in stored(history_db)] == [
+        f"SAB{i:04d}A" for i in range(8) if i != 3
+    ]
+    assert ingestor.stats()["gates"]["main"]["set_aside"] == 1
+    with open(ingestor.rejects_path) as rejects:
+        record, = [json.loads(line) for line in rejects]
+    assert record["plate_number"] == "SAB0003A"
+    assert record["timestamp"] == (READ_AT + timedelta(seconds=3)).isoformat()
+    assert "CHECK constraint failed" in record["error"]
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import delete, insert
+from app import database
+from app.schema import guest_temp
+from app.utils.pending_guests import PendingGuestFeed
+
+CHECK_IN = datetime(2026, 3, 2, 8)
+
+
+def add_guests(engine, *guests):
+    """Insert (name, minutes after CHECK_IN) pending guests."""
+    rows = [
+        {"name": name, "plate_number": f"GST{i:04d}", "id_number": name, "check_in_date": CHECK_IN + timedelta(minutes=minutes)}
+        for i, (name, minutes) in enumerate(guests)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(guest_temp), rows)
+
+
+@pytest.fixture
+def fetches(history_db, monkeypatch):
+    """Arguments of every fetch_pending_guests call: None for a full fetch, else `since`."""
+    calls = []
+    fetch = database.fetch_pending_guests
+
+    def recording_fetch(since=None):
+        calls.append(since)
+        return fetch(since=since)
+
+    monkeypatch.setattr(database, "fetch_pending_guests", recording_fetch)
+    return calls
+
+
+def names(feed):
+    return sorted(feed.get()["Name"])
+
+
+def test_unchanged_guests_are_not_fetched_again(history_db, fetches):
+    add_guests(history_db, ("Aisyah", 0), ("Ben", 5))
+    feed = PendingGuestFeed()
+    assert feed.refresh(force=True)
+    assert not feed.refresh(force=True)
+    assert names(feed) == ["Aisyah", "Ben"]
+    assert fetches == [None]
+    assert feed.version == 1
+
+
+def test_new_guests_are_fetched_as_a_delta(history_db, fetches):
+    add_guests(history_db, ("Aisyah", 0))
+    feed = PendingGuestFeed()
+    feed.refresh(force=True)
+    add_guests(history_db, ("Ben", 5))
+    assert feed.refresh(force=True)
+    assert names(feed) == ["Aisyah", "Ben"]
+    assert fetches == [None, CHECK_IN]
+
+
+def test_decided_guests_are_dropped_without_a_full_fetch(history_db, fetches):
+    add_guests(history_db, ("Aisyah", 0), ("Ben", 5), ("Chen", 10))
+    feed = PendingGuestFeed()
+    feed.refresh(force=True)
+    with history_db.begin() as conn:
+        conn.execute(delete(guest_temp).where(guest_temp.c.name == "Ben"))
+    assert feed.refresh(force=True)
+    assert names(feed) == ["Aisyah", "Chen"]
+    assert fetches == [None, CHECK_IN + timedelta(minutes=10)]
+
+
+def test_changes_the_delta_cannot_explain_fall_back_to_a_full_fetch(history_db, fetches):
+    add_guests(history_db, ("Aisyah", 0), ("Ben", 5))
+    feed = PendingGuestFeed()
+    feed.refresh(force=True)
+    # Checked in before the latest guest, so the delta since then misses it
+    add_guests(history_db, ("Chen", 2))
+    assert feed.refresh(force=True)
+    assert names(feed) == ["Aisyah", "Ben", "Chen"]
+    assert fetches == [None, CHECK_IN + timedelta(minutes=5), None]
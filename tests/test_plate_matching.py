@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert
+from app.database import get_latest_vehicle_detail
+from app.schema import guest, registered_vehicle, users, vehicle_history
+from app.utils.plate_matching import PlateMatcher, plate_distance
+from app.utils.plate_registry import get_plate_registry
+
+NOW = datetime(2026, 3, 2, 8)
+
+
+def detect(engine, plate, confidence=0.95, registration_status=0):
+    """Write a detection and return the gate screen's (status, detail) for it."""
+    with engine.begin() as conn:
+        conn.execute(insert(vehicle_history), {
+            "plate_number": plate, "confidence": confidence, "timestamp": NOW, "registration_status": registration_status,
+        })
+    status, vehicle_df = get_latest_vehicle_detail()
+    return status, vehicle_df.iloc[0].to_dict()
+
+
+@pytest.fixture
+def campus(history_db):
+    with history_db.begin() as conn:
+        conn.execute(insert(users), {"username": "aminah", "fullname": "Aminah Salleh"})
+        conn.execute(insert(registered_vehicle), [
+            {"number_plate": plate, "username": "aminah", "pass_expiry_date": NOW + timedelta(days=365)}
+            for plate in ("SAB1234A", "QAA8821C", "WZG9349K")
+        ])
+    return history_db
+
+
+def test_confusable_characters_cost_less_than_other_substitutions():
+    assert plate_distance("SAB1234A", "sab-1234a") == 0
+    assert plate_distance("SAB1234A", "5A81234A") == pytest.approx(0.6)
+    assert plate_distance("SAB1234A", "SAB1234X") == 1.0
+    assert plate_distance("SAB1234A", "SAB124A") == 1.0
+
+
+def test_matcher_ranks_candidates_and_declines_ties():
+    matcher = PlateMatcher(["SAB1234A", "SAB1234B", "QAA8821C"])
+    assert [(candidate.plate, candidate.distance) for candidate in matcher.candidates("SAB12348")] == [
+        ("SAB1234B", 0.3), ("SAB1234A", 1.0),
+    ]
+    assert matcher.best_match("SAB12348").plate == "SAB1234B"
+    # One dropped character away from both plates
+    assert [candidate.plate for candidate in matcher.candidates("SAB1234")] == ["SAB1234A", "SAB1234B"]
+    assert matcher.best_match("SAB1234") is None
+    assert matcher.candidates("JJU7") == []
+
+
+def test_a_misread_registered_plate_is_shown_as_the_registered_vehicle(campus):
+    status, detail = detect(campus, "5AB1234A")
+    assert status == 1
+    assert detail["plate_number"] == "SAB1234A"
+    assert detail["owner_name"] == "Aminah Salleh"
+    assert detail["read_plate"] == "5AB1234A"
+    assert detail["match_distance"] == pytest.approx(0.3)
+
+
+def test_a_low_confidence_exact_read_lists_near_alternatives(campus):
+    status, detail = detect(campus, "QAA8821C", confidence=0.5, registration_status=1)
+    assert status == 1
+    assert detail["read_plate"] is None
+    assert detail["plate_candidates"] == []
+
+    status, detail = detect(campus, "SAB1234A", confidence=0.5, registration_status=1)
+    assert detail["plate_candidates"] == []
+    with campus.begin() as conn:
+        conn.execute(insert(registered_vehicle), {"number_plate": "SA81234A", "username": "aminah", "pass_expiry_date": NOW})
+    get_plate_registry().build()
+    status, detail = detect(campus, "SAB1234A", confidence=0.5, registration_status=1)
+    assert detail["plate_candidates"] == [("SA81234A", 0.3)]
+
+
+def test_newly_approved_guests_are_matched_after_a_refresh(campus):
+    status, detail = detect(campus, "VKA5S55")
+    assert status == 0
+    with campus.begin() as conn:
+        conn.execute(insert(guest), {
+            "name": "Ravi", "plate_number": "VKA5555", "is_approved": True,
+            "check_in_date": NOW, "check_out_date": NOW + timedelta(hours=4), "created_at": NOW,
+        })
+    get_plate_registry().invalidate()
+    status, detail = detect(campus, "VKA5S55")
+    assert status == 2
+    assert detail["guest_name"] == "Ravi"
+    assert detail["read_plate"] == "VKA5S55"
@@ -0,0 +1,65 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import func, insert, select
+from app import database
+from app.schema import vehicle_history
+from app.utils import history_cache, plate_search
+from app.utils.plate_search import get_plate_search_index
+
+
+def add_plates(engine, *plates, ids=None):
+    rows = [
+        {"plate_number": plate, "confidence": 0.9, "timestamp": datetime(2026, 3, 2, 8), "registration_status": 0}
+        for plate in plates
+    ]
+    if ids is not None:
+        for row, vehicle_history_id in zip(rows, ids):
+            row["vehicle_history_id"] = vehicle_history_id
+    with engine.begin() as conn:
+        conn.execute(insert(vehicle_history), rows)
+
+
+def matching_rows(engine, plate_filter):
+    query = select(func.count()).select_from(vehicle_history).where(database.plate_filter_condition(plate_filter))
+    with engine.connect() as conn:
+        return conn.execute(query).scalar()
+
+
+@pytest.fixture
+def index(history_db, monkeypatch):
+    # Every search reads the rows written since the previous one
+    monkeypatch.setattr(history_cache, "TAIL_CACHE_MIN_REFRESH_SECONDS", 0)
+    add_plates(history_db, "SAB 1234A", "sab-1234a", "WZG9349K", "SAB9876B")
+    return get_plate_search_index()
+
+
+def test_substring_and_prefix_searches_match_normalized_plates(index):
+    assert index.search("b12") == ["SAB 1234A", "sab-1234a"]
+    assert index.search("sab-12 34") == ["SAB 1234A", "sab-1234a"]
+    assert index.search("9349K") == ["WZG9349K"]
+    assert index.search("sab", prefix=True) == ["SAB 1234A", "SAB9876B", "sab-1234a"]
+    assert index.search("AB", prefix=True) == []
+    assert index.search("-") is None
+
+
+def test_new_detections_are_searchable(history_db, index):
+    assert index.search("VKA") == []
+    add_plates(history_db, "VKA 555")
+    assert index.search("VKA") == ["VKA 555"]
+
+
+def test_rows_the_tail_cache_missed_are_found_after_a_rebuild(history_db, index, monkeypatch):
+    add_plates(history_db, "JJU 7", ids=[10])
+    assert index.search("JJU") == ["JJU 7"]
+    # Committed by a concurrent writer below the id the tail cache already reached
+    add_plates(history_db, "PKR 42", ids=[8])
+    assert index.search("PKR") == []
+    monkeypatch.setattr(plate_search, "PLATE_SEARCH_REBUILD_SECONDS", 0)
+    assert index.search("PKR") == ["PKR 42"]
+
+
+@pytest.mark.parametrize("plate_filter, rows", [("sab 1234", 2), ("SAB1234A", 2), ("9349", 1), ("zzz", 0), ("-", 1)])
+def test_index_and_substring_scan_find_the_same_rows(history_db, index, monkeypatch, plate_filter, rows):
+    assert matching_rows(history_db, plate_filter) == rows
+    monkeypatch.setattr(database, "PLATE_SEARCH_MAX_PLATES", 0)
+    assert matching_rows(history_db, plate_filter) == rows
@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import StaticPool
+from app import settings
+from app.database import engine_options
+from app.utils import pool_metrics
+from app.utils.pool_metrics import InstrumentedQueuePool, PoolMetrics
+
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = PoolMetrics()
+    monkeypatch.setattr(pool_metrics, "pool_metrics", metrics)
+    return metrics
+
+
+def test_in_memory_sqlite_shares_one_connection():
+    assert engine_options("sqlite://")["poolclass"] is StaticPool
+    assert engine_options("sqlite:///scvacs.sqlite3")["poolclass"] is InstrumentedQueuePool
+
+
+def test_checkouts_overflow_and_waits_are_counted(tmp_path, monkeypatch, metrics):
+    monkeypatch.setattr(settings, "POOL_SIZE", 1)
+    monkeypatch.setattr(settings, "MAX_OVERFLOW", 1)
+    monkeypatch.setattr(settings, "POOL_TIMEOUT", 0.2)
+    url = f"sqlite:///{tmp_path / 'pool.sqlite3'}"
+    engine = create_engine(url, **engine_options(url))
+    metrics.attach(engine)
+
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    snapshot = metrics.snapshot(engine)
+    first.close()
+    second.close()
+    engine.dispose()
+
+    assert snapshot["checkouts"] == 2
+    assert snapshot["overflow_checkouts"] == 1
+    assert snapshot["peak_checked_out"] == 2
+    assert snapshot["checked_out"] == 2
+    # The third checkout waited out the pool timeout
+    assert snapshot["wait_ms_max"] >= 200
+    assert snapshot["wait_ms_histogram"]["<=500"] == 1
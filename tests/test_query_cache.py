@@ -0,0 +1,68 @@
+import pytest
+from app.utils import query_cache
+from app.utils.query_cache import QueryCache, cached_query, invalidate_queries, skip_caching
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = QueryCache()
+    monkeypatch.setattr(query_cache, "query_cache", cache)
+    return cache
+
+
+def test_results_are_served_until_invalidated(cache):
+    calls = []
+
+    @cached_query(ttl=60)
+    def fetch_count(plate):
+        calls.append(plate)
+        return len(calls)
+
+    assert fetch_count("SAB1234A") == 1
+    assert fetch_count("SAB1234A") == 1
+    invalidate_queries("fetch_count")
+    assert fetch_count("SAB1234A") == 2
+    assert calls == ["SAB1234A", "SAB1234A"]
+
+
+def test_result_read_before_an_invalidation_is_not_cached(cache):
+    rows = ["before write"]
+
+    @cached_query(ttl=60)
+    def fetch_rows():
+        value = list(rows)
+        # A write lands and invalidates while this read is still in flight
+        rows.append("written")
+        invalidate_queries("fetch_rows")
+        return value
+
+    assert fetch_rows() == ["before write"]
+    found, _ = cache.get(("fetch_rows", (), ()))
+    assert not found
+
+
+def test_invalidating_everything_discards_reads_of_every_function(cache):
+    generation = cache.generation("fetch_rows")
+    cache.invalidate()
+    cache.set(("fetch_rows", (), ()), "stale", ttl=60, generation=generation)
+    assert cache.get(("fetch_rows", (), ())) == (False, None)
+
+    cache.set(("fetch_rows", (), ()), "fresh", ttl=60, generation=cache.generation("fetch_rows"))
+    assert cache.get(("fetch_rows", (), ())) == (True, "fresh")
+
+
+def test_results_marked_with_skip_caching_are_not_stored(cache):
+    calls = []
+
+    @cached_query(ttl=60)
+    def fetch_page():
+        calls.append(1)
+        if len(calls) == 1:
+            skip_caching()
+            return "Error fetching page"
+        return "page"
+
+    assert fetch_page() == "Error fetching page"
+    assert fetch_page() == "page"
+    assert fetch_page() == "page"
+    assert len(calls) == 2
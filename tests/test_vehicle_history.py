@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+import pandas as pd
+from sqlalchemy import insert
+from app.pages import vehicle_history
+from app.schema import vehicle_history as vehicle_history_table
+from app.utils.history_cache import VehicleHistoryTailCache
+
+
+def insert_detections(engine, count, start):
+    rows = [
+        {"plate_number": f"SAB{i:04d}A", "confidence": 0.9, "timestamp": start + timedelta(seconds=i), "registration_status": 0}
+        for i in range(count)
+    ]
+    with engine.begin() as conn:
+        conn.execute(insert(vehicle_history_table), rows)
+
+
+def test_first_page_falls_back_to_the_database_when_the_cache_cannot_answer(history_db, monkeypatch):
+    # Age-based eviction leaves only the last hour's 10 rows, fewer than a page
+    insert_detections(history_db, 100, datetime.now() - timedelta(days=3))
+    insert_detections(history_db, 10, datetime.now() - timedelta(hours=1))
+    history_cache = VehicleHistoryTailCache()
+    monkeypatch.setattr(vehicle_history, "get_history_cache", lambda: history_cache)
+
+    history_cache.refresh(force=True)
+    assert history_cache.latest_page(vehicle_history.PAGE_SIZE) is None
+
+    data, next_cursor = vehicle_history.load_history_page(("", None, None), None)
+    assert isinstance(data, pd.DataFrame)
+    assert len(data) == vehicle_history.PAGE_SIZE
+    assert next_cursor is not None